@@ -0,0 +1,32 @@
+"""Pytest fixtures giving each test a fresh, isolated database.
+
+`file_database` and `memory_database` wrap `isolated_database` from
+`src.db.harness`; `database` runs a test once against each of them.
+"""
+
+from typing import Iterator
+
+import pytest
+
+from src.db.harness import isolated_database
+
+
+@pytest.fixture
+def file_database() -> Iterator[str]:
+    """Points `Database` at a fresh temporary file for the test."""
+    with isolated_database("file") as url:
+        yield url
+
+
+@pytest.fixture
+def memory_database() -> Iterator[str]:
+    """Points `Database` at a fresh private in-memory database for the test."""
+    with isolated_database("memory") as url:
+        yield url
+
+
+@pytest.fixture(params=("file", "memory"))
+def database(request: pytest.FixtureRequest) -> Iterator[str]:
+    """Points `Database` at a fresh database of each kind in turn."""
+    with isolated_database(request.param) as url:
+        yield url
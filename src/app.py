@@ -2,6 +2,7 @@
 Management System using tkinter."""
 
 from abc import ABC
+import datetime
 import tkinter
 import tkinter.messagebox
 import tkinter.ttk
@@ -9,10 +10,15 @@ from tkcalendar import DateEntry
 from typing import Literal, Optional
 from src.models.purchase import Purchase
 from src.db.database import Database
+from src.db.catalog import Catalog
+from src.db.availability import DailyAvailability
+from src.db.changelog import Changelog
+from src.models.catalog import CatalogSnapshot
 from src.exceptions import db_exceptions
 from src.models.user import User
 from src.utils.color import Color
 from src.models.car import Car
+from src.utils.tracing import traced
 
 class UILog:
     """User Interface for logging in or registering users
@@ -50,6 +56,7 @@ class UILog:
     def __validate_numeric(self, P: str) -> bool:
         return P.isdigit() or P == ""
 
+    @traced("ui")
     def save_data(self) -> None:
         name: str = self.__box_name.get()
         phone: int = self.__box_phone.get()
@@ -62,54 +69,118 @@ class UILog:
                     Database.add_user(name=name, phone_number=phone)
 
                 self.__user = Database.get_user(name=name, phone_number=phone)
-                UISelectEvent(self.__user)
+                ScreenManager.show(UISelectEvent, self.__user)
 
             except db_exceptions.PhoneNumberRepeated:
                 tkinter.messagebox.showerror(message="The phone number has already been registered by another user.")
 
 
-class UISelectEvent:
+class Screen(ABC):
+    """Window shown after logging in. It is built once by the `ScreenManager`
+    and then hidden, reset and shown again on every navigation."""
+
+    def __init__(self, user: User) -> None:
+        self._user: User = user
+        self._window: tkinter.Toplevel = tkinter.Toplevel()
+        self._window.config(padx=35, pady=35)
+        self._window.protocol("WM_DELETE_WINDOW", self.hide)
+
+    def show(self) -> None:
+        self._window.deiconify()
+        self._window.focus()
+
+    def hide(self) -> None:
+        self._window.grab_release()
+        self._window.withdraw()
+
+    def reset(self, user: User) -> None:
+        """Clears what the previous visit left in the screen."""
+        self._user = user
+
+    def exists(self) -> bool:
+        return bool(self._window.winfo_exists())
+
+    def destroy(self) -> None:
+        self._window.destroy()
+
+
+class ScreenManager:
+    """Keeps one instance of each screen and switches between them.
+
+    Screens are built lazily the first time they are shown; afterwards
+    navigating only hides the current window and resets and shows the next.
+    """
+
+    _screens: dict[type[Screen], Screen] = dict()
+    _current: Optional[Screen] = None
+
+    @staticmethod
+    def show(screen: type[Screen], user: User) -> Screen:
+        if ScreenManager._current and ScreenManager._current.exists():
+            ScreenManager._current.hide()
+
+        instance: Optional[Screen] = ScreenManager._screens.get(screen)
+        if instance is None or not instance.exists():
+            instance = screen(user)
+            ScreenManager._screens[screen] = instance
+        else:
+            instance.reset(user)
+
+        instance.show()
+        ScreenManager._current = instance
+        return instance
+
+    @staticmethod
+    def clear() -> None:
+        """Destroys every screen built so far."""
+        for instance in ScreenManager._screens.values():
+            if instance.exists():
+                instance.destroy()
+        ScreenManager._screens.clear()
+        ScreenManager._current = None
+
+
+class UISelectEvent(Screen):
     """User Interface for user events after logging in."""
 
+    @traced("ui")
     def __init__(self, user: User) -> None:
-        self.__window: tkinter.Toplevel = tkinter.Toplevel()
-        self.__window.config(padx=35, pady=35)
-        self.__window.title("Welcome")
+        super().__init__(user)
+        self._window.title("Welcome")
 
-        self.__driver_test: tkinter.ttk.Button = tkinter.ttk.Button(self.__window, text="Driver Test", command=self.open_driver_test)
+        self.__driver_test: tkinter.ttk.Button = tkinter.ttk.Button(self._window, text="Driver Test", command=self.open_driver_test)
         self.__driver_test.grid(column=0, row=1)
 
-        self.__purchase: tkinter.ttk.Button = tkinter.ttk.Button(self.__window, text="Purchase", command=self.open_purchase)
+        self.__purchase: tkinter.ttk.Button = tkinter.ttk.Button(self._window, text="Purchase", command=self.open_purchase)
         self.__purchase.grid(column=1, row=1)
-        self.__window.focus()
-        self.__window.grab_set()
-        self.__user: User = user
 
+    def show(self) -> None:
+        super().show()
+        self._window.grab_set()
+
+    @traced("ui")
     def open_driver_test(self) -> None:
-        UIDriver_test(self.__user)
-        self.__window.destroy()
+        ScreenManager.show(UIDriver_test, self._user)
 
+    @traced("ui")
     def open_purchase(self) -> None:
-        UIPurchase(self.__user)
-        self.__window.destroy()
+        ScreenManager.show(UIPurchase, self._user)
 
 
-class Event(ABC):
+class Event(Screen):
     """Clase abstracta que define un evento."""
 
     def __init__(self, user: User) -> None:
-        self._user: User = user
-        self._window: tkinter.Toplevel = tkinter.Toplevel()
-        self._window.config(padx=35, pady=35)
-        self._window.focus()
+        super().__init__(user)
         self._undo: tkinter.ttk.Button = tkinter.ttk.Button(self._window, text="Undo", command=self.return_page)
 
+    @traced("ui")
     def return_page(self) -> None:
-        UISelectEvent(self._user)
-        self._window.destroy()
+        ScreenManager.show(UISelectEvent, self._user)
 
 
 class UIPurchase(Event):
+    @traced("ui")
     def __init__(self, user: User) -> None:
         super().__init__(user)
         self._window.title("Purchase")
@@ -119,24 +190,18 @@ class UIPurchase(Event):
         self._label_car: tkinter.Label = tkinter.Label(self._window, text="Select type car")
         self._label_car.grid(column=0, row=0)
         self._types_car: tkinter.Listbox = tkinter.Listbox(self._window, selectmode=tkinter.SINGLE, exportselection=False)
-        for i in Purchase.TYPES_CAR:
-            self._types_car.insert(tkinter.END, i)
         self._types_car.grid(column=1, row=0)
 
         # rim configuration
         self._label_rim: tkinter.Label = tkinter.Label(self._window, text="Select type rim")
         self._label_rim.grid(column=0, row=1)
         self._types_rim: tkinter.Listbox = tkinter.Listbox(self._window, selectmode=tkinter.SINGLE, exportselection=False)
-        for i in Purchase.TYPES_RIM:
-            self._types_rim.insert(tkinter.END, i)
         self._types_rim.grid(column=1, row=1)
 
         # Engine displacement
         self._label_engine: tkinter.Label = tkinter.Label(self._window, text="Select Engine displacement")
         self._label_engine.grid(column=3, row=0)
         self._engine_displacement: tkinter.Listbox = tkinter.Listbox(self._window, selectmode=tkinter.SINGLE, exportselection=False)
-        for i in Purchase.ENGINE_DISPLACEMENT:
-            self._engine_displacement.insert(tkinter.END, i)
         self._engine_displacement.grid(column=4, row=0)
 
         self._label_color: tkinter.Label = tkinter.Label(self._window, text="Select color (r, g, b)")
@@ -145,8 +210,6 @@ class UIPurchase(Event):
         self._label_sede: tkinter.Label = tkinter.Label(self._window, text="Select Engine displacement")
         self._label_sede.grid(column=5, row=0)
         self._sedes: tkinter.Listbox = tkinter.Listbox(self._window, selectmode=tkinter.SINGLE, exportselection=False)
-        for i in Purchase.SEDES:
-            self._sedes.insert(tkinter.END, i)
         self._sedes.grid(column=6, row=0)
 
         vcmd = (self._window.register(self.validate_color), '%P')
@@ -163,12 +226,33 @@ class UIPurchase(Event):
         self._label_pay: tkinter.Label = tkinter.Label(self._window, text="Select pay method")
         self._label_pay.grid(column=3, row=2)
         self._pay: tkinter.Listbox = tkinter.Listbox(self._window, selectmode=tkinter.SINGLE, exportselection=False)
-        for i in Purchase.PAY_METHODS:
-            self._pay.insert(tkinter.END, i)
         self._pay.grid(column=4, row=2)
 
         self.resul: Optional[Purchase] = None
         self._car: Optional[Car] = None
+        self._fill_options(Catalog.get())
+
+    def _fill_options(self, catalog: CatalogSnapshot) -> None:
+        self._catalog: CatalogSnapshot = catalog
+        for listbox, values in ((self._types_car, catalog.car_types),
+                                (self._types_rim, catalog.rim_types),
+                                (self._engine_displacement, catalog.engine_displacements),
+                                (self._sedes, catalog.branches),
+                                (self._pay, catalog.pay_methods)):
+            listbox.delete(0, tkinter.END)
+            listbox.insert(tkinter.END, *values)
+
+    def reset(self, user: User) -> None:
+        super().reset(user)
+        catalog: CatalogSnapshot = Catalog.reload_if_changed()
+        if catalog is not self._catalog:
+            self._fill_options(catalog)
+        for listbox in (self._types_car, self._types_rim, self._engine_displacement, self._sedes, self._pay):
+            listbox.selection_clear(0, tkinter.END)
+        for entry in (self._color_r, self._color_g, self._color_b):
+            entry.delete(0, tkinter.END)
+        self.resul = None
+        self._car = None
 
     def validate_color(self, P: str):
         if P == '':
@@ -179,6 +263,7 @@ class UIPurchase(Event):
                 return True
         return False
 
+    @traced("ui")
     def submit(self):
         try:
             r: int = int(self._color_r.get())
@@ -195,26 +280,41 @@ class UIPurchase(Event):
         engine_displacement = self._engine_displacement.curselection()
         pay_method = self._pay.curselection()
         sede = self._sedes.curselection()
-        if not type_car or not type_rim or not engine_displacement or not pay_method or not pay_method:
+        if not type_car or not type_rim or not engine_displacement or not pay_method or not sede:
             tkinter.messagebox.showerror("Invalid Input", "You must select all fields")
             return
 
-        type_car = Purchase.TYPES_CAR[type_car[0]]
-        type_rim = Purchase.TYPES_RIM[type_rim[0]]
-        engine_displacement = Purchase.ENGINE_DISPLACEMENT[engine_displacement[0]]
-        pay_method = Purchase.PAY_METHODS[pay_method[0]]
-        sede = Purchase.SEDES[sede[0]]
+        type_car = self._catalog.car_types[type_car[0]]
+        type_rim = self._catalog.rim_types[type_rim[0]]
+        engine_displacement = self._catalog.engine_displacements[engine_displacement[0]]
+        pay_method = self._catalog.pay_methods[pay_method[0]]
+        sede = self._catalog.branches[sede[0]]
+
+        if not self._catalog.is_available(sede, type_car, type_rim, engine_displacement):
+            tkinter.messagebox.showerror("Not Available", f"This configuration is not sold in {sede}")
+            return
+        price: Optional[int] = self._catalog.price(sede, type_car, type_rim, engine_displacement)
 
         self._car = Car(type_car, type_rim, color, engine_displacement, color)
         self.resul = Purchase(user=self._user, car=self._car, pay_method=pay_method)
         tkinter.messagebox.showinfo(f"Name: {self._user.get_name()} Telefono: {self._user.get_number()}" f"tipo de carro: {type_car}",
-                                    f"tipo de rin: {type_rim}\nCilindraje: {engine_displacement}\nColor: {color}\nMétodo de pago: {pay_method}\nSede {sede}")
+                                    f"tipo de rin: {type_rim}\nCilindraje: {engine_displacement}\nColor: {color}\nMétodo de pago: {pay_method}\nSede {sede}"
+                                    f"\nPrecio: {price if price is not None else 'consultar en la sede'}")
 
 class UIDriver_test(Event):
+    """Screen to book a driver test.
+
+    Attributes:
+        BOOKING_DAYS (int): How many days ahead the calendar offers.
+    """
+
+    BOOKING_DAYS: int = 60
+
+    @traced("ui")
     def __init__(self, user: User) -> None:
         super().__init__(user)
         self._window.title("Driver Test")
-        self._undo.grid(column=0, row=2)
+        self._undo.grid(column=0, row=3)
 
         # Select date
         self._date: DateEntry = DateEntry(self._window,
@@ -230,23 +330,67 @@ class UIDriver_test(Event):
         self._hour_combo = tkinter.ttk.Combobox(self._window, values=["08:00", "09:00", "10:00", "11:00", "12:00"])
         self._hour_combo.grid(column=2, row=0)
 
-        # Select car
+        # Select branch
+        self._branch_label = tkinter.ttk.Label(self._window, text="Select branch:")
+        self._branch_label.grid(column=1, row=1)
+        self._branch_combo = tkinter.ttk.Combobox(self._window, values=Catalog.get().branches, state="readonly")
+        self._branch_combo.grid(column=2, row=1)
+        self._branch_combo.bind("<<ComboboxSelected>>", self.select_branch)
+
+        # Select car, among the types sold at the branch
         self._car_type_label = tkinter.ttk.Label(self._window, text="Select car type:")
-        self._car_type_label.grid(column=1, row=1)
-        self._car_type_combo = tkinter.ttk.Combobox(self._window, values=Purchase.TYPES_CAR)
-        self._car_type_combo.grid(column=2, row=1)
+        self._car_type_label.grid(column=1, row=2)
+        self._car_type_combo = tkinter.ttk.Combobox(self._window, values=Catalog.get().car_types)
+        self._car_type_combo.grid(column=2, row=2)
+        self._car_type_combo.bind("<<ComboboxSelected>>", self.refresh_days)
 
         # Send button
         self._send_button = tkinter.ttk.Button(self._window, text="Send", command=self.submit)
-        self._send_button.grid(column=1, row=2)
-
+        self._send_button.grid(column=1, row=3)
+
+        self._free_days: set[datetime.date] = set()
+        self.refresh_days()
+
+    def reset(self, user: User) -> None:
+        super().reset(user)
+        catalog: CatalogSnapshot = Catalog.reload_if_changed()
+        self._date.set_date(datetime.date.today())
+        self._hour_combo.set("")
+        self._branch_combo.set("")
+        self._branch_combo.configure(values=catalog.branches)
+        self._car_type_combo.set("")
+        self._car_type_combo.configure(values=catalog.car_types)
+        self.refresh_days()
+
+    def refresh_days(self, _event: tkinter.Event = None) -> None:
+        """Limits the calendar to the days with a free slot for the selection."""
+        today: datetime.date = datetime.date.today()
+        days: list[datetime.date] = DailyAvailability.available_days(
+            today, today + datetime.timedelta(days=UIDriver_test.BOOKING_DAYS),
+            self._branch_combo.get() or None, self._car_type_combo.get() or None)
+        self._free_days = set(days)
+        self._date.configure(mindate=days[0] if days else today, maxdate=days[-1] if days else None)
+        self._date.set_date(self._date.get_date())
+
+    def select_branch(self, _event: tkinter.Event = None) -> None:
+        """Offers only the car types sold at the selected branch."""
+        car_types: tuple[str, ...] = Catalog.get().car_types_by_branch.get(self._branch_combo.get(), tuple())
+        if self._car_type_combo.get() not in car_types:
+            self._car_type_combo.set("")
+        self._car_type_combo.configure(values=car_types)
+        self.refresh_days()
+
+    @traced("ui")
     def submit(self):
         date = self._date.get_date()
         hour = self._hour_combo.get()
+        branch = self._branch_combo.get()
         car_type = self._car_type_combo.get()
 
-        if not date or not hour or not car_type:
+        if not date or not hour or not branch or not car_type:
             tkinter.messagebox.showerror("Invalid Input", "All fields must be filled")
+        elif date not in self._free_days:
+            tkinter.messagebox.showerror("Invalid Input", "There are no free slots on that day")
         else:
             tkinter.messagebox.showinfo(
                 "Appointment Registered",
@@ -254,4 +398,8 @@ class UIDriver_test(Event):
             )
 
 if __name__ == "__main__":
+    Database.create_tables()
+    Catalog.create()
+    Changelog.create()
+    DailyAvailability.create()
     ui_log = UILog()
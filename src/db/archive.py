@@ -0,0 +1,329 @@
+"""This module provides SlotArchive, which moves past driver test slots out of
+the live database into compressed monthly archive databases.
+
+Slots whose day is older than the archive horizon are copied, a bounded
+batch at a time, into `<archive_dir>/YYYY-MM.db` and then deleted from the
+live table, so the write lock on the live database is only held for one
+small DELETE per batch. Once a run finishes, each touched month is vacuumed
+and gzip-compressed to `YYYY-MM.db.gz`.
+
+Archived months are decompressed into a cache on demand and attached to the
+connection answering a history query, which sees the live table and the
+archives as one `driver_test_history` view.
+
+Usage:
+    python -m src.db.archive --horizon-days 365
+"""
+
+import argparse
+import datetime
+import gzip
+import os
+import shutil
+import sqlite3
+from typing import Iterator, Optional
+
+from src.db.database import Database
+
+COLUMNS: str = ("id, test_day, test_hour, car_type, rim_type, engine_displacement, "
+                "external_color, internal_color, available, driver_id, branch")
+
+# Matches a live slot only if none of its columns changed since it was read.
+_UNCHANGED: str = " AND ".join(f"{column} IS ?" for column in COLUMNS.split(", "))
+
+
+class SlotArchive:
+    """
+    Archive of past driver test slots, split in one database per month.
+
+    Attributes:
+        _archive_dir (str): Directory holding the monthly archive files.
+        _cache_dir (str): Directory holding decompressed months while in use.
+        _horizon_days (int): Slots older than this many days are archived.
+        _batch_size (int): Maximum number of slots moved per transaction.
+    """
+
+    def __init__(self,
+                 archive_dir: str = "src/db/archive",
+                 horizon_days: int = 365,
+                 batch_size: int = 500) -> None:
+        self._archive_dir: str = archive_dir
+        self._cache_dir: str = os.path.join(archive_dir, ".cache")
+        self._horizon_days: int = horizon_days
+        self._batch_size: int = batch_size
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+    def _plain_path(self, month: str) -> str:
+        return os.path.join(self._archive_dir, f"{month}.db")
+
+    def _compressed_path(self, month: str) -> str:
+        return os.path.join(self._archive_dir, f"{month}.db.gz")
+
+    def months(self) -> list[str]:
+        """
+        Lists the archived months.
+
+        Returns:
+            list[str]: The archived months as "YYYY-MM", in order.
+        """
+        names: set[str] = {name.split(".")[0] for name in os.listdir(self._archive_dir)
+                           if name.endswith((".db", ".db.gz"))}
+        return sorted(names)
+
+    def _open_month(self, month: str) -> sqlite3.Connection:
+        """
+        Opens the archive of a month for writing, decompressing it if needed.
+
+        Args:
+            month (str): The month as "YYYY-MM".
+
+        Returns:
+            sqlite3.Connection: A connection to the plain archive file.
+        """
+        plain: str = self._plain_path(month)
+        compressed: str = self._compressed_path(month)
+        if not os.path.exists(plain) and os.path.exists(compressed):
+            with gzip.open(compressed, "rb") as source, open(plain, "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(compressed)
+
+        # The archive table follows the live one, columns added later included.
+        live: sqlite3.Connection = Database.open_connection()
+        try:
+            schema: str = live.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'driver_test'").fetchone()[0]
+            columns: list[tuple] = live.execute("PRAGMA table_info(driver_test)").fetchall()
+        finally:
+            live.close()
+
+        con: sqlite3.Connection = sqlite3.connect(plain)
+        archived: set[str] = {i[1] for i in con.execute("PRAGMA table_info(driver_test)")}
+        if not archived:
+            con.execute(schema)
+        for _, name, column_type, *_ in columns:
+            if archived and name not in archived:
+                con.execute(f"ALTER TABLE driver_test ADD COLUMN {name} {column_type}")
+        con.commit()
+        return con
+
+    def _compress(self, month: str) -> None:
+        """Vacuums and gzips the plain archive of a month."""
+        plain: str = self._plain_path(month)
+        con: sqlite3.Connection = sqlite3.connect(plain)
+        try:
+            con.execute("VACUUM")
+        finally:
+            con.close()
+        with open(plain, "rb") as source, gzip.open(self._compressed_path(month) + ".tmp", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.replace(self._compressed_path(month) + ".tmp", self._compressed_path(month))
+        os.remove(plain)
+
+    def run(self, today: Optional[datetime.date] = None) -> int:
+        """
+        Moves every slot older than the horizon into the monthly archives.
+
+        Each batch is first committed to its archive files and only then
+        deleted from the live table, so an interrupted run never loses slots;
+        running it again finishes the job. A slot is only deleted if it has
+        not changed since it was copied, so concurrent bookings are kept.
+
+        Args:
+            today (Optional[datetime.date]): Day the horizon is counted from.
+            Defaults to the current day.
+
+        Returns:
+            int: The number of slots archived.
+        """
+        today = today or datetime.date.today()
+        cutoff: str = (today - datetime.timedelta(days=self._horizon_days)).isoformat()
+        archived: int = 0
+        touched: set[str] = set()
+
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            while True:
+                rows: list[tuple] = con.execute(
+                    f"SELECT {COLUMNS} FROM driver_test WHERE test_day < ? ORDER BY id LIMIT ?",
+                    (cutoff, self._batch_size)).fetchall()
+                if not rows:
+                    break
+
+                by_month: dict[str, list[tuple]] = dict()
+                for row in rows:
+                    by_month.setdefault(row[1][:7], list()).append(row)
+                for month, month_rows in by_month.items():
+                    archive: sqlite3.Connection = self._open_month(month)
+                    try:
+                        archive.executemany(f"INSERT OR REPLACE INTO driver_test({COLUMNS}) "
+                                            f"VALUES ({', '.join('?' * 11)})", month_rows)
+                        archive.commit()
+                    finally:
+                        archive.close()
+                    touched.add(month)
+
+                # A slot booked or edited since it was read is left in place,
+                # and its stale copy is dropped from the archive; if it is
+                # still past the horizon the next batch archives it again.
+                con.executemany(f"DELETE FROM driver_test WHERE {_UNCHANGED}", rows)
+                con.commit()
+                kept: set[int] = {i[0] for i in con.execute(
+                    f"SELECT id FROM driver_test WHERE id IN ({', '.join('?' * len(rows))})",
+                    [row[0] for row in rows])}
+                for month in {row[1][:7] for row in rows if row[0] in kept}:
+                    archive = self._open_month(month)
+                    try:
+                        archive.executemany("DELETE FROM driver_test WHERE id = ?", [(i,) for i in kept])
+                        archive.commit()
+                    finally:
+                        archive.close()
+                archived += len(rows) - len(kept)
+        finally:
+            con.close()
+
+        for month in touched:
+            self._compress(month)
+        return archived
+
+    def _attachable(self, month: str) -> str:
+        """
+        Returns a plain file holding the archive of a month, for ATTACH.
+
+        Compressed months are decompressed into the cache, which is reused
+        until the compressed file changes.
+
+        Args:
+            month (str): The month as "YYYY-MM".
+
+        Returns:
+            str: Path of a plain SQLite file.
+        """
+        plain: str = self._plain_path(month)
+        if os.path.exists(plain):
+            return plain
+        compressed: str = self._compressed_path(month)
+        cached: str = os.path.join(self._cache_dir, f"{month}.db")
+        if not os.path.exists(cached) or os.path.getmtime(cached) < os.path.getmtime(compressed):
+            with gzip.open(compressed, "rb") as source, open(cached + ".tmp", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.replace(cached + ".tmp", cached)
+        return cached
+
+    def _months_between(self, start: datetime.date, end: datetime.date) -> list[str]:
+        """Returns the archived months overlapping the range from `start` to `end`."""
+        return [month for month in self.months()
+                if start.isoformat()[:7] <= month <= end.isoformat()[:7]]
+
+    def connect_history(self, start: datetime.date, end: datetime.date) -> sqlite3.Connection:
+        """
+        Opens a connection whose `driver_test_history` view covers the archives.
+
+        The view is the live driver_test table followed by every archived
+        month overlapping the range, each attached to the connection. When
+        there are more months than SQLite can attach, they are copied into a
+        temporary table instead.
+
+        Args:
+            start (datetime.date): First day the caller is interested in.
+            end (datetime.date): Last day the caller is interested in.
+
+        Returns:
+            sqlite3.Connection: A new connection owned by the caller.
+        """
+        months: list[str] = self._months_between(start, end)
+        con: sqlite3.Connection = Database.open_connection()
+        limit: int = self._raise_attach_limit(con)
+
+        selects: list[str] = [f"SELECT {COLUMNS} FROM main.driver_test"]
+        if len(months) > limit:
+            con.execute(f"CREATE TEMP TABLE archived_driver_test AS SELECT {COLUMNS} FROM main.driver_test WHERE 0")
+            rows: list[tuple] = list(self._archived_rows(con, months, limit))
+            con.executemany(f"INSERT INTO archived_driver_test VALUES ({', '.join('?' * 11)})", rows)
+            con.commit()
+            selects.append(f"SELECT {COLUMNS} FROM temp.archived_driver_test")
+            months = list()
+        for month in months:
+            schema: str = "archive_" + month.replace("-", "_")
+            con.execute("ATTACH DATABASE ? AS " + schema, (self._attachable(month),))
+            selects.append(f"SELECT {COLUMNS} FROM {schema}.driver_test")
+        con.execute("CREATE TEMP VIEW driver_test_history AS " + " UNION ALL ".join(selects))
+        return con
+
+    @staticmethod
+    def _raise_attach_limit(con: sqlite3.Connection) -> int:
+        """
+        Raises the number of databases `con` can attach as far as SQLite allows.
+
+        Returns:
+            int: The new limit.
+        """
+        # Limits are capped at the compile-time maximum, 125 at most.
+        con.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 125)
+        return con.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+
+    def _archived_rows(self, con: sqlite3.Connection, months: list[str], limit: int,
+                       where: str = "", params: tuple = ()) -> Iterator[tuple]:
+        """
+        Yields the slots of archived months, attaching at most `limit` at once.
+
+        Args:
+            con (sqlite3.Connection): The connection to attach the months to.
+            months (list[str]): The months as "YYYY-MM".
+            limit (int): Number of databases that can still be attached.
+            where (str): Optional condition on the slots, with placeholders.
+            params (tuple): Values for the placeholders of `where`.
+
+        Yields:
+            tuple: The slot columns, in the order of `COLUMNS`.
+        """
+        for first in range(0, len(months), limit):
+            chunk: list[str] = months[first:first + limit]
+            schemas: list[str] = ["chunk_" + month.replace("-", "_") for month in chunk]
+            for month, schema in zip(chunk, schemas):
+                con.execute("ATTACH DATABASE ? AS " + schema, (self._attachable(month),))
+            query: str = " UNION ALL ".join(f"SELECT {COLUMNS} FROM {schema}.driver_test {where}"
+                                            for schema in schemas)
+            yield from con.execute(query, params * len(schemas)).fetchall()
+            for schema in schemas:
+                con.execute("DETACH DATABASE " + schema)
+
+    def history(self, start: datetime.date, end: datetime.date) -> Iterator[tuple]:
+        """
+        Yields every slot between `start` and `end`, live or archived.
+
+        Archived months are attached a few at a time, so any range works.
+
+        Args:
+            start (datetime.date): First day, included.
+            end (datetime.date): Last day, included.
+
+        Yields:
+            tuple: The slot columns, in the order of `COLUMNS`.
+        """
+        where: str = "WHERE test_day BETWEEN ? AND ?"
+        params: tuple[str, str] = (start.isoformat(), end.isoformat())
+
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            yield from con.execute(f"SELECT {COLUMNS} FROM main.driver_test {where}", params)
+            yield from self._archived_rows(con, self._months_between(start, end),
+                                           self._raise_attach_limit(con), where, params)
+        finally:
+            con.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive past driver test slots.")
+    parser.add_argument("--database", default=Database.get_database_url())
+    parser.add_argument("--archive-dir", default="src/db/archive")
+    parser.add_argument("--horizon-days", type=int, default=365)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    Database.set_database_url(args.database)
+
+    archive: SlotArchive = SlotArchive(args.archive_dir, args.horizon_days, args.batch_size)
+    print(f"{archive.run()} slots archived")
+
+
+if __name__ == "__main__":
+    main()
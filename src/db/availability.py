@@ -0,0 +1,171 @@
+"""This module provides DailyAvailability, a materialized summary of how many
+free driver test slots each day has, per branch and car type.
+
+The `daily_availability` table is kept up to date by triggers on
+`driver_test`, so rendering a month calendar is a single range read on the
+summary primary key instead of a scan of every slot.
+
+Usage:
+    python -m src.db.availability create|verify|rebuild
+"""
+
+import argparse
+import datetime
+import sqlite3
+from typing import Optional
+
+from src.db.database import Database
+
+
+class DailyAvailability:
+    """Incrementally maintained count of free slots per day, branch and car type."""
+
+    # Slots without branch or car type are counted under ''. The triggers are
+    # recreated, so `create` also upgrades a summary installed earlier.
+    _SCHEMA: str = """
+        CREATE TABLE IF NOT EXISTS daily_availability (
+            test_day DATE NOT NULL,
+            branch TEXT NOT NULL,
+            car_type TEXT NOT NULL,
+            free INTEGER NOT NULL,
+            PRIMARY KEY (test_day, branch, car_type)
+        ) WITHOUT ROWID;
+
+        DROP TRIGGER IF EXISTS daily_availability_insert;
+        CREATE TRIGGER daily_availability_insert AFTER INSERT ON driver_test BEGIN
+            INSERT INTO daily_availability(test_day, branch, car_type, free)
+            VALUES (new.test_day, IFNULL(new.branch, ''), IFNULL(new.car_type, ''), new.available IS 1)
+            ON CONFLICT(test_day, branch, car_type) DO UPDATE SET free = free + excluded.free;
+        END;
+
+        DROP TRIGGER IF EXISTS daily_availability_delete;
+        CREATE TRIGGER daily_availability_delete AFTER DELETE ON driver_test BEGIN
+            UPDATE daily_availability SET free = free - (old.available IS 1)
+            WHERE test_day = old.test_day
+            AND branch = IFNULL(old.branch, '') AND car_type = IFNULL(old.car_type, '');
+        END;
+
+        DROP TRIGGER IF EXISTS daily_availability_update;
+        CREATE TRIGGER daily_availability_update
+        AFTER UPDATE OF test_day, branch, car_type, available ON driver_test BEGIN
+            UPDATE daily_availability SET free = free - (old.available IS 1)
+            WHERE test_day = old.test_day
+            AND branch = IFNULL(old.branch, '') AND car_type = IFNULL(old.car_type, '');
+            INSERT INTO daily_availability(test_day, branch, car_type, free)
+            VALUES (new.test_day, IFNULL(new.branch, ''), IFNULL(new.car_type, ''), new.available IS 1)
+            ON CONFLICT(test_day, branch, car_type) DO UPDATE SET free = free + excluded.free;
+        END;
+    """
+
+    _AGGREGATE: str = """
+        SELECT test_day, IFNULL(branch, ''), IFNULL(car_type, ''), SUM(available IS 1)
+        FROM driver_test GROUP BY 1, 2, 3
+    """
+
+    @staticmethod
+    def create() -> None:
+        """
+        Creates the summary table and its triggers and fills it from driver_test.
+        """
+        Database.create_tables()
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            con.executescript(DailyAvailability._SCHEMA)
+        finally:
+            con.close()
+        DailyAvailability.rebuild()
+
+    @staticmethod
+    def rebuild() -> None:
+        """
+        Recomputes the whole summary from driver_test in one transaction.
+        """
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            con.execute("DELETE FROM daily_availability")
+            con.execute("INSERT INTO daily_availability(test_day, branch, car_type, free) "
+                        + DailyAvailability._AGGREGATE)
+            con.commit()
+        finally:
+            con.close()
+
+    @staticmethod
+    def verify() -> list[tuple[str, str, str, int, int]]:
+        """
+        Compares the summary with a fresh aggregate of driver_test.
+
+        Returns:
+            list[tuple[str, str, str, int, int]]: The (day, branch, car type,
+            summary count, actual count) entries that disagree. Empty when the
+            summary is correct.
+        """
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            expected: dict[tuple[str, str, str], int] = {
+                i[:3]: i[3] for i in con.execute(DailyAvailability._AGGREGATE)}
+            stored: dict[tuple[str, str, str], int] = {
+                i[:3]: i[3] for i in con.execute(
+                    "SELECT test_day, branch, car_type, free FROM daily_availability")}
+        finally:
+            con.close()
+
+        return [(*key, stored.get(key, 0), expected.get(key, 0))
+                for key in sorted(expected.keys() | stored.keys())
+                if stored.get(key, 0) != expected.get(key, 0)]
+
+    @staticmethod
+    def available_days(start: datetime.date,
+                       end: datetime.date,
+                       branch: Optional[str] = None,
+                       car_type: Optional[str] = None) -> list[datetime.date]:
+        """
+        Retrieves the days between `start` and `end` with at least one free slot.
+
+        Args:
+            start (datetime.date): First day of the range, included.
+            end (datetime.date): Last day of the range, included.
+            branch (Optional[str]): Only count slots of this branch.
+            car_type (Optional[str]): Only count slots of this car type.
+
+        Returns:
+            list[datetime.date]: The days with a free slot, in order.
+        """
+        query: str = """
+            SELECT test_day FROM daily_availability
+            WHERE test_day BETWEEN :start AND :end AND free > 0
+            AND (:branch IS NULL OR branch = :branch)
+            AND (:car_type IS NULL OR car_type = :car_type)
+            GROUP BY test_day
+        """
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            result_query: list[tuple[str]] = con.execute(query, {
+                "start": start.isoformat(), "end": end.isoformat(),
+                "branch": branch, "car_type": car_type}).fetchall()
+            return [datetime.date.fromisoformat(i[0]) for i in result_query]
+        finally:
+            con.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the daily_availability summary.")
+    parser.add_argument("command", choices=("create", "verify", "rebuild"))
+    parser.add_argument("--database", default=Database.get_database_url())
+    args = parser.parse_args()
+    Database.set_database_url(args.database)
+
+    if args.command == "create":
+        DailyAvailability.create()
+    elif args.command == "rebuild":
+        DailyAvailability.rebuild()
+    else:
+        mismatches: list[tuple[str, str, str, int, int]] = DailyAvailability.verify()
+        for day, branch, car_type, stored, actual in mismatches:
+            print(f"{day} {branch!r} {car_type!r}: summary {stored}, actual {actual}")
+        print("daily_availability is consistent" if not mismatches
+              else f"{len(mismatches)} mismatches, run 'rebuild' to fix them")
+        raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""This module provides BackupManager, online backups of the database with
+verification, retention and point-in-time restore.
+
+Backups are taken with the SQLite online backup API in throttled page
+batches, so bookings keep running while the copy is made and the result is
+always a consistent snapshot, never a torn file. In WAL mode, which
+`Database.create_tables` enables, the copy reads a single snapshot and is
+never restarted by concurrent bookings. Each backup is checked with
+`PRAGMA integrity_check`, checksummed and recorded in `backups.json` in the
+backup directory, which keeps only the newest `retention` backups.
+
+When the changelog is enabled (see `src.db.changelog`), a backup can be
+rolled forward to any moment after it was taken. The application enables it
+on start-up; `enable-changelog` does so for an existing database.
+
+Usage:
+    python -m src.db.backup enable-changelog|backup|list|verify|impact
+    python -m src.db.backup restore TARGET [--at "YYYY-MM-DD HH:MM:SS"]
+"""
+
+import argparse
+import dataclasses
+from dataclasses import dataclass
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from src.db.changelog import Changelog
+from src.db.database import Database
+from src.db.replica import copy_snapshot
+from src.exceptions import db_exceptions
+
+
+@dataclass
+class BackupRecord:
+    """Represents a backup listed in the backup catalog.
+
+    Attributes:
+        file (str): Name of the backup file, inside the backup directory.
+        created_at (str): UTC time the snapshot was completed, as
+        "YYYY-MM-DD HH:MM:SS.fff" like the changelog timestamps.
+        sha256 (str): Checksum of the backup file.
+        size (int): Size of the backup file in bytes.
+        duration (float): Seconds the backup took.
+        changelog_seq (Optional[int]): Last changelog entry included in the
+        backup, or None if the database had no changelog.
+    """
+
+    file: str
+    created_at: str
+    sha256: str
+    size: int
+    duration: float
+    changelog_seq: Optional[int]
+
+
+def _now() -> str:
+    """Returns the current UTC time in the changelog timestamp format."""
+    return datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def _moment(at: str) -> str:
+    """
+    Converts a moment to the changelog timestamp format.
+
+    Args:
+        at (str): An ISO 8601 date and time. Without a time zone it is taken
+        as UTC.
+
+    Returns:
+        str: The moment in UTC, as "YYYY-MM-DD HH:MM:SS.fff".
+
+    Raises:
+        ValueError: If `at` is not an ISO 8601 date and time.
+    """
+    try:
+        moment: datetime.datetime = datetime.datetime.fromisoformat(at)
+    except ValueError as error:
+        raise ValueError(f"{at!r} is not an ISO 8601 date and time") from error
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.astimezone(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def _sha256(path: str) -> str:
+    """Returns the SHA-256 checksum of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class BackupManager:
+    """
+    Takes, verifies and restores backups of the database.
+
+    Attributes:
+        _backup_dir (str): Directory holding the backups and their catalog.
+        _retention (int): Number of backups kept.
+        _pages (int): Pages copied per backup step.
+        _step_sleep (float): Seconds to sleep between backup steps.
+    """
+
+    def __init__(self,
+                 backup_dir: str = "src/db/backups",
+                 retention: int = 7,
+                 pages: int = 128,
+                 step_sleep: float = 0.005) -> None:
+        self._backup_dir: str = backup_dir
+        self._retention: int = retention
+        self._pages: int = pages
+        self._step_sleep: float = step_sleep
+        os.makedirs(backup_dir, exist_ok=True)
+
+    def _catalog_path(self) -> str:
+        return os.path.join(self._backup_dir, "backups.json")
+
+    def records(self) -> list[BackupRecord]:
+        """
+        Reads the backup catalog.
+
+        Returns:
+            list[BackupRecord]: The backups, oldest first.
+        """
+        if not os.path.exists(self._catalog_path()):
+            return list()
+        with open(self._catalog_path(), encoding="utf-8") as file:
+            return [BackupRecord(**record) for record in json.load(file)]
+
+    def _write_records(self, records: list[BackupRecord]) -> None:
+        """Atomically replaces the backup catalog."""
+        with open(self._catalog_path() + ".tmp", "w", encoding="utf-8") as file:
+            json.dump([dataclasses.asdict(record) for record in records], file, indent=2)
+        os.replace(self._catalog_path() + ".tmp", self._catalog_path())
+
+    def backup(self) -> BackupRecord:
+        """
+        Takes a verified backup of the database and applies the retention.
+
+        The changes logged before the oldest backup kept are deleted from the
+        changelog, since no restore can replay them any more.
+
+        Returns:
+            BackupRecord: The new backup.
+
+        Raises:
+            db_exceptions.BackupCorrupted: If the copy fails its integrity check.
+            ValueError: If the database is not in WAL mode.
+        """
+        started: float = time.perf_counter()
+        name: str = "backup-" + datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S%fZ") + ".db"
+        staging: str = os.path.join(self._backup_dir, name + ".tmp")
+
+        source: sqlite3.Connection = Database.open_connection()
+        target: sqlite3.Connection = sqlite3.connect(staging)
+        try:
+            copy_snapshot(source, target, self._pages, self._step_sleep)
+            created_at: str = _now()
+            # Keep the backup a single self-contained file.
+            target.execute("PRAGMA journal_mode=DELETE")
+            if target.execute("PRAGMA integrity_check").fetchone()[0] != "ok":
+                raise db_exceptions.BackupCorrupted(f"{name} failed its integrity check")
+            changelog_seq: Optional[int] = Changelog.last_seq(target)
+        finally:
+            target.close()
+            source.close()
+
+        path: str = os.path.join(self._backup_dir, name)
+        os.replace(staging, path)
+        record: BackupRecord = BackupRecord(file=name,
+                                            created_at=created_at,
+                                            sha256=_sha256(path),
+                                            size=os.path.getsize(path),
+                                            duration=time.perf_counter() - started,
+                                            changelog_seq=changelog_seq)
+
+        records: list[BackupRecord] = self.records() + [record]
+        for old in records[:-self._retention]:
+            old_path: str = os.path.join(self._backup_dir, old.file)
+            if os.path.exists(old_path):
+                os.remove(old_path)
+        self._write_records(records[-self._retention:])
+
+        # Only changes after the oldest kept backup can still be replayed.
+        kept: list[int] = [old.changelog_seq for old in records[-self._retention:] if old.changelog_seq is not None]
+        if kept:
+            Changelog.prune(min(kept))
+        return record
+
+    def verify(self, record: BackupRecord) -> None:
+        """
+        Checks that a backup is intact.
+
+        Args:
+            record (BackupRecord): The backup to check.
+
+        Raises:
+            db_exceptions.BackupCorrupted: If the file is missing, its checksum
+            changed or it fails its integrity check.
+        """
+        path: str = os.path.join(self._backup_dir, record.file)
+        if not os.path.exists(path):
+            raise db_exceptions.BackupCorrupted(f"{record.file} is missing")
+        if _sha256(path) != record.sha256:
+            raise db_exceptions.BackupCorrupted(f"{record.file} does not match its checksum")
+        con: sqlite3.Connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            if con.execute("PRAGMA integrity_check").fetchone()[0] != "ok":
+                raise db_exceptions.BackupCorrupted(f"{record.file} failed its integrity check")
+        finally:
+            con.close()
+
+    def restore(self, target_url: str, at: Optional[str] = None) -> BackupRecord:
+        """
+        Restores the database into a new file.
+
+        Without `at`, the newest backup is restored. With `at`, the newest
+        backup taken before that moment is restored and then rolled forward
+        with the changes the current database logged up to that moment.
+
+        Args:
+            target_url (str): Path of the file to restore into. It must not exist.
+            at (Optional[str]): Moment to restore, as an ISO 8601 date and
+            time such as "YYYY-MM-DD HH:MM:SS[.fff]". Without a time zone it
+            is taken as UTC.
+
+        Returns:
+            BackupRecord: The backup the restore started from.
+
+        Raises:
+            db_exceptions.NoFoundBackup: If no backup is old enough, or if `at`
+            is given and that backup was taken without the changelog.
+            db_exceptions.BackupCorrupted: If that backup fails verification.
+            FileExistsError: If `target_url` already exists.
+            ValueError: If `at` is not an ISO 8601 date and time.
+        """
+        if os.path.exists(target_url):
+            raise FileExistsError(target_url)
+        if at is not None:
+            at = _moment(at)
+        candidates: list[BackupRecord] = [record for record in self.records()
+                                          if at is None or record.created_at <= at]
+        if not candidates:
+            raise db_exceptions.NoFoundBackup(f"no backup taken before {at}")
+        record: BackupRecord = candidates[-1]
+        if at is not None and record.changelog_seq is None:
+            raise db_exceptions.NoFoundBackup(
+                f"{record.file} was taken without the changelog and cannot be rolled forward to {at}")
+        self.verify(record)
+
+        source: sqlite3.Connection = sqlite3.connect(os.path.join(self._backup_dir, record.file))
+        target: sqlite3.Connection = sqlite3.connect(target_url)
+        try:
+            source.backup(target)
+            target.execute("PRAGMA journal_mode=WAL")
+            if at is not None:
+                primary: sqlite3.Connection = Database.open_connection()
+                try:
+                    changes: list[tuple] = primary.execute(
+                        "SELECT seq, ts, tbl, op, row_id, data FROM changelog "
+                        "WHERE seq > ? AND ts <= ? ORDER BY seq",
+                        (record.changelog_seq, at)).fetchall()
+                finally:
+                    primary.close()
+                Changelog.replay(target, changes)
+        finally:
+            target.close()
+            source.close()
+        return record
+
+
+def _latencies(stop: threading.Event, result: list[float]) -> None:
+    """Books free slots one at a time until `stop` is set, recording latencies."""
+    slot: int = 1
+    while not stop.is_set():
+        start: float = time.perf_counter()
+        Database.book_driver_tests([(slot, slot)])
+        result.append(time.perf_counter() - start)
+        slot += 1
+
+
+def impact(slots: int = 200000) -> None:
+    """
+    Reports how long a backup takes and how it affects booking latency.
+
+    Bookings run in a loop on a scratch database, first while a backup is
+    taken and then alone for as long as the backup took, and the latency percentiles of both runs are printed.
+
+    Args:
+        slots (int): Number of users and slots in the scratch database.
+    """
+    from src.db.booking_load import prepare
+
+    with tempfile.TemporaryDirectory() as directory:
+        prepare(os.path.join(directory, "impact.db"), slots)
+        manager: BackupManager = BackupManager(os.path.join(directory, "backups"))
+
+        def measure(duration: Optional[float]) -> tuple[list[float], Optional[BackupRecord]]:
+            stop: threading.Event = threading.Event()
+            latencies: list[float] = list()
+            worker: threading.Thread = threading.Thread(target=_latencies, args=(stop, latencies))
+            worker.start()
+            record: Optional[BackupRecord] = None
+            if duration is None:
+                record = manager.backup()
+            else:
+                time.sleep(duration)
+            stop.set()
+            worker.join()
+            return sorted(latencies), record
+
+        busy, record = measure(None)
+        idle, _ = measure(record.duration)
+        for label, latencies in (("without backup", idle), ("during backup", busy)):
+            print(f"{label:<15} {len(latencies):>6} bookings  "
+                  f"p50 {latencies[len(latencies) // 2] * 1000:.2f} ms  "
+                  f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+        print(f"backup of {record.size / 1e6:.1f} MB took {record.duration:.2f} s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Back up and restore the database.")
+    parser.add_argument("command", choices=("enable-changelog", "backup", "list", "verify", "restore", "impact"))
+    parser.add_argument("target", nargs="?", help="file to restore into")
+    parser.add_argument("--at", help='moment to restore, "YYYY-MM-DD HH:MM:SS" in UTC or ISO 8601 with a time zone')
+    parser.add_argument("--database", default=Database.get_database_url())
+    parser.add_argument("--backup-dir", default="src/db/backups")
+    parser.add_argument("--retention", type=int, default=7)
+    args = parser.parse_args()
+    Database.set_database_url(args.database)
+    manager: BackupManager = BackupManager(args.backup_dir, args.retention)
+
+    if args.command == "enable-changelog":
+        Changelog.create()
+        print("changelog enabled")
+    elif args.command == "backup":
+        record: BackupRecord = manager.backup()
+        print(f"{record.file} ({record.size} bytes) in {record.duration:.2f} s")
+    elif args.command == "list":
+        for record in manager.records():
+            print(f"{record.created_at}  {record.file}  {record.size} bytes  changelog {record.changelog_seq}")
+    elif args.command == "verify":
+        for record in manager.records():
+            manager.verify(record)
+            print(f"{record.file} ok")
+    elif args.command == "restore":
+        if not args.target:
+            parser.error("restore needs a target file")
+        try:
+            at: Optional[str] = _moment(args.at) if args.at else None
+        except ValueError as error:
+            parser.error(str(error))
+        record = manager.restore(args.target, at)
+        print(f"restored {record.file} into {args.target}" + (f" up to {at} UTC" if at else ""))
+    else:
+        impact()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Load generator for the BookingPool.
+
+Creates a scratch database full of free driver test slots, fires booking
+requests at a `BookingPool` for each requested number of workers and
+reports the sustained bookings per second and the latency percentiles.
+
+Usage:
+    python -m src.db.booking_load --workers 1 2 4 8 --requests 5000
+"""
+
+import argparse
+import datetime
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import Future
+
+from src.db.booking_pool import BookingPool
+from src.db.database import Database
+from src.models.driver_test import DriverTest
+from src.models.user import User
+
+
+def prepare(path: str, requests: int) -> None:
+    """
+    Fills a new database with one user and one free slot per request.
+
+    Args:
+        path (str): Path of the scratch database file.
+        requests (int): Number of users and slots to create.
+    """
+    Database.set_database_url(path)
+    Database.create_tables()
+    con: sqlite3.Connection = sqlite3.connect(path)
+    try:
+        start: datetime.datetime = datetime.datetime(2030, 1, 1, 8)
+        con.executemany("INSERT INTO users(id, name, phone_number) VALUES(?, ?, ?)",
+                        ((i, f"user {i}", 3000000000 + i) for i in range(1, requests + 1)))
+        con.executemany('''
+            INSERT INTO driver_test (id, test_day, test_hour, car_type, rim_type, engine_displacement,
+                                     external_color, internal_color, available, driver_id)
+            VALUES (?, ?, ?, 'Sedan', 'Sport', 2000, '0, 0, 0', '0, 0, 0', 1, NULL)
+        ''', ((i, (start + datetime.timedelta(hours=i)).date().isoformat(),
+               (start + datetime.timedelta(hours=i)).time().isoformat())
+              for i in range(1, requests + 1)))
+        con.commit()
+    finally:
+        con.close()
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    """Returns the `percent` percentile of an already sorted list."""
+    index: int = min(len(values) - 1, int(len(values) * percent / 100))
+    return values[index]
+
+
+def run(workers: int, requests: int, batch_size: int, mode: str) -> dict[str, float]:
+    """
+    Books `requests` slots through a BookingPool of `workers` workers.
+
+    Args:
+        workers (int): Number of pool workers.
+        requests (int): Number of bookings to submit.
+        batch_size (int): Maximum bookings per transaction.
+        mode (str): "thread" or "process".
+
+    Returns:
+        dict[str, float]: Throughput in bookings per second and latency
+        percentiles in milliseconds.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        prepare(os.path.join(directory, "load.db"), requests)
+        latencies: list[float] = list()
+
+        def track(future: Future, submitted: float) -> None:
+            future.add_done_callback(lambda _: latencies.append(time.perf_counter() - submitted))
+
+        futures: list[Future] = list()
+        start: float = time.perf_counter()
+        with BookingPool(workers=workers, batch_size=batch_size, mode=mode) as pool:
+            for i in range(1, requests + 1):
+                submitted: float = time.perf_counter()
+                future: Future = pool.submit(User(number_id=i), DriverTest(number_id=i))
+                track(future, submitted)
+                futures.append(future)
+        elapsed: float = time.perf_counter() - start
+
+        failed: int = sum(1 for future in futures if future.exception() is not None)
+        latencies.sort()
+        return {
+            "bookings_per_sec": (requests - failed) / elapsed,
+            "p50_ms": _percentile(latencies, 50) * 1000,
+            "p95_ms": _percentile(latencies, 95) * 1000,
+            "p99_ms": _percentile(latencies, 99) * 1000,
+            "failed": failed,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure BookingPool throughput and latency.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--mode", choices=("thread", "process"), default="thread")
+    args = parser.parse_args()
+
+    print(f"{'workers':>8} {'bookings/s':>12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'failed':>7}")
+    for workers in args.workers:
+        stats: dict[str, float] = run(workers, args.requests, args.batch_size, args.mode)
+        print(f"{workers:>8} {stats['bookings_per_sec']:>12.0f} {stats['p50_ms']:>8.2f} "
+              f"{stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f} {stats['failed']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""This module provides a BookingPool that queues driver test bookings and
+commits them in grouped transactions from a pool of workers.
+
+Bookings are handed in one at a time through `BookingPool.submit`, which
+returns a future for each request. Workers drain the queue in batches and
+book each batch with `Database.book_driver_tests`, so a burst of requests
+costs one transaction per batch instead of one per booking.
+"""
+
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+import queue
+import threading
+from typing import Literal, Optional
+
+from src.db.database import Database
+from src.exceptions import diver_test_exceptions
+from src.models.driver_test import DriverTest
+from src.models.user import User
+
+
+class BookingPool:
+    """
+    A queue of pending bookings served by a configurable pool of workers.
+
+    Attributes:
+        _queue (queue.Queue): Pending bookings, bounded to apply backpressure.
+        _batch_size (int): Maximum number of bookings committed together.
+        _batch_wait (float): Seconds a worker waits for a batch to fill up.
+        _workers (list[threading.Thread]): Threads draining the queue.
+        _executor (Optional[ProcessPoolExecutor]): Processes running the
+        transactions when the pool works in "process" mode.
+    """
+
+    _STOP = object()
+
+    def __init__(self,
+                 workers: int = 4,
+                 batch_size: int = 32,
+                 max_pending: int = 1024,
+                 mode: Literal["thread", "process"] = "thread",
+                 batch_wait: float = 0.002) -> None:
+        """
+        Starts the workers.
+
+        Args:
+            workers (int): Number of workers committing batches.
+            batch_size (int): Maximum number of bookings per transaction.
+            max_pending (int): Maximum number of queued bookings before
+            `submit` blocks.
+            mode (Literal["thread", "process"]): Whether transactions run in
+            the worker threads or in a pool of processes.
+            batch_wait (float): Seconds a worker waits for more bookings
+            before committing a partial batch.
+        """
+        if mode not in ("thread", "process"):
+            raise ValueError("mode must be 'thread' or 'process'")
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._batch_size: int = batch_size
+        self._batch_wait: float = batch_wait
+        self._executor: Optional[ProcessPoolExecutor] = None
+        if mode == "process":
+            self._executor = ProcessPoolExecutor(max_workers=workers,
+                                                 initializer=Database.set_database_url,
+                                                 initargs=(Database.get_database_url(),))
+
+        self._workers: list[threading.Thread] = [
+            threading.Thread(target=self._work, daemon=True) for _ in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def __enter__(self) -> "BookingPool":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.shutdown()
+
+    def submit(self, user: User, driver_test: DriverTest,
+               timeout: Optional[float] = None) -> Future:
+        """
+        Queues a booking.
+
+        Blocks while the queue is full.
+
+        Args:
+            user (User): The user who is going to book.
+            driver_test (DriverTest): The booking to be made.
+            timeout (Optional[float]): Seconds to wait for room in the queue,
+            or None to wait indefinitely.
+
+        Returns:
+            Future: Resolves to None once the booking is committed, or raises
+            `NoAvaliableDriverTest` if the slot was already taken.
+
+        Raises:
+            diver_test_exceptions.BookingQueueFull: If the queue is still full
+            after `timeout` seconds.
+        """
+        future: Future = Future()
+        try:
+            self._queue.put((user.get_id(), driver_test.get_id(), future), timeout=timeout)
+        except queue.Full as error:
+            raise diver_test_exceptions.BookingQueueFull from error
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stops the workers once every queued booking has been processed.
+
+        Args:
+            wait (bool): Whether to block until the workers have finished.
+        """
+        for _ in self._workers:
+            self._queue.put(self._STOP)
+        if wait:
+            for worker in self._workers:
+                worker.join()
+        if self._executor:
+            self._executor.shutdown(wait=wait)
+
+    def _next_batch(self) -> tuple[list[tuple[int, int, Future]], bool]:
+        """
+        Takes up to `_batch_size` bookings from the queue.
+
+        Returns:
+            tuple[list[tuple[int, int, Future]], bool]: The batch and whether
+            the worker was asked to stop.
+        """
+        batch: list[tuple[int, int, Future]] = list()
+        item = self._queue.get()
+        while item is not self._STOP:
+            batch.append(item)
+            if len(batch) >= self._batch_size:
+                return batch, False
+            try:
+                item = self._queue.get(timeout=self._batch_wait)
+            except queue.Empty:
+                return batch, False
+        return batch, True
+
+    def _work(self) -> None:
+        """Worker loop: commits batches until a stop marker is received."""
+        stop: bool = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                try:
+                    self._commit(batch)
+                except Exception as error:
+                    # Keep serving the queue; no request is left pending.
+                    for *_, future in batch:
+                        self._resolve(future, error)
+
+    @staticmethod
+    def _resolve(future: Future, error: Optional[BaseException] = None) -> None:
+        """
+        Resolves a future, unless it was already resolved.
+
+        Args:
+            future (Future): The future of a booking.
+            error (Optional[BaseException]): The exception to raise from the
+            future, or None if the booking was committed.
+        """
+        try:
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+        except InvalidStateError:
+            pass
+
+    def _commit(self, batch: list[tuple[int, int, Future]]) -> None:
+        """
+        Books a batch and resolves the futures of its requests.
+
+        Requests whose future was cancelled while queued are dropped; the
+        others can no longer be cancelled once the transaction starts.
+
+        Args:
+            batch (list[tuple[int, int, Future]]): Triples of (user id,
+            driver test id, future).
+        """
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        bookings: list[tuple[int, int]] = [(user_id, test_id) for user_id, test_id, _ in batch]
+        try:
+            if self._executor:
+                booked: list[bool] = self._executor.submit(Database.book_driver_tests,
+                                                           bookings).result()
+            else:
+                booked = Database.book_driver_tests(bookings)
+        except Exception as error:
+            for *_, future in batch:
+                self._resolve(future, error)
+            return
+
+        for (*_, future), ok in zip(batch, booked):
+            self._resolve(future, None if ok else diver_test_exceptions.NoAvaliableDriverTest())
@@ -0,0 +1,186 @@
+"""This module provides the Catalog class, which stores the vehicle catalog
+in the database and serves it as an in-memory `CatalogSnapshot`.
+
+Every change to the catalog tables bumps `catalog_version` through
+triggers. Services keep using their cached snapshot and call
+`Catalog.reload_if_changed`, a single-row read, to pick up edits without
+restarting.
+
+While the catalog tables have not been created, the snapshot is built from
+the defaults on `Purchase`, with every configuration sold at every branch.
+"""
+
+import itertools
+import sqlite3
+from typing import Optional
+
+from src.db.database import Database
+from src.models.catalog import CatalogSnapshot, Configuration
+from src.models.purchase import Purchase
+
+
+class Catalog:
+    """
+    Access to the vehicle catalog.
+
+    Attributes:
+        _snapshot (Optional[CatalogSnapshot]): The last loaded snapshot.
+    """
+
+    _OPTION_KINDS: tuple[str, ...] = ("car_type", "rim_type", "engine_displacement", "pay_method", "branch")
+
+    _SCHEMA: str = """
+        CREATE TABLE IF NOT EXISTS catalog_option (
+            kind TEXT NOT NULL,
+            value TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (kind, value)
+        );
+
+        CREATE TABLE IF NOT EXISTS catalog_availability (
+            branch TEXT NOT NULL,
+            car_type TEXT NOT NULL,
+            rim_type TEXT NOT NULL,
+            engine_displacement INTEGER NOT NULL,
+            price INTEGER,
+            PRIMARY KEY (branch, car_type, rim_type, engine_displacement)
+        );
+
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        );
+
+        INSERT OR IGNORE INTO catalog_version(id, version) VALUES (1, 0);
+    """
+
+    _snapshot: Optional[CatalogSnapshot] = None
+
+    @staticmethod
+    def create() -> None:
+        """
+        Creates the catalog tables and their version triggers, and fills them
+        with the `Purchase` defaults if they are empty.
+        """
+        triggers: str = "".join(
+            f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version AFTER {event} ON {table} BEGIN
+                UPDATE catalog_version SET version = version + 1;
+            END;
+            """
+            for table in ("catalog_option", "catalog_availability")
+            for event in ("INSERT", "UPDATE", "DELETE"))
+
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            con.executescript(Catalog._SCHEMA + triggers)
+            if con.execute("SELECT COUNT(*) FROM catalog_option").fetchone()[0] == 0:
+                defaults: CatalogSnapshot = Catalog._defaults()
+                options: list[tuple[str, str, int]] = [
+                    (kind, str(value), position)
+                    for kind, values in zip(Catalog._OPTION_KINDS, Catalog._options_of(defaults))
+                    for position, value in enumerate(values)]
+                con.executemany("INSERT INTO catalog_option(kind, value, position) VALUES (?, ?, ?)", options)
+                con.executemany("""INSERT INTO catalog_availability(branch, car_type, rim_type,
+                                                                   engine_displacement, price)
+                                   VALUES (?, ?, ?, ?, ?)""",
+                                [(*key, price) for key, price in defaults.prices.items()])
+            con.commit()
+        finally:
+            con.close()
+
+    @staticmethod
+    def _options_of(snapshot: CatalogSnapshot) -> tuple[tuple, ...]:
+        """Returns the option tuples of a snapshot in the order of `_OPTION_KINDS`."""
+        return (snapshot.car_types, snapshot.rim_types, snapshot.engine_displacements,
+                snapshot.pay_methods, snapshot.branches)
+
+    @staticmethod
+    def _defaults() -> CatalogSnapshot:
+        """Builds the catalog from the hard-coded `Purchase` options."""
+        prices: dict[Configuration, Optional[int]] = {
+            configuration: None for configuration in itertools.product(
+                Purchase.SEDES, Purchase.TYPES_CAR, Purchase.TYPES_RIM, Purchase.ENGINE_DISPLACEMENT)}
+        return CatalogSnapshot(version=0,
+                               car_types=tuple(Purchase.TYPES_CAR),
+                               rim_types=tuple(Purchase.TYPES_RIM),
+                               engine_displacements=tuple(Purchase.ENGINE_DISPLACEMENT),
+                               pay_methods=tuple(Purchase.PAY_METHODS),
+                               branches=tuple(Purchase.SEDES),
+                               prices=prices)
+
+    @staticmethod
+    def version() -> int:
+        """
+        Reads the current catalog version from the database.
+
+        Returns:
+            int: The version stamp, or 0 if the catalog tables do not exist.
+        """
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            return con.execute("SELECT version FROM catalog_version").fetchone()[0]
+        except sqlite3.OperationalError:
+            return 0
+        finally:
+            con.close()
+
+    @staticmethod
+    def load() -> CatalogSnapshot:
+        """
+        Loads a new snapshot from the database and caches it.
+
+        Returns:
+            CatalogSnapshot: The snapshot.
+        """
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            with con:
+                version: int = con.execute("SELECT version FROM catalog_version").fetchone()[0]
+                rows: list[tuple[str, str]] = con.execute(
+                    "SELECT kind, value FROM catalog_option ORDER BY kind, position").fetchall()
+                availability: list[tuple[str, str, str, int, Optional[int]]] = con.execute(
+                    """SELECT branch, car_type, rim_type, engine_displacement, price
+                       FROM catalog_availability""").fetchall()
+        except sqlite3.OperationalError:
+            Catalog._snapshot = Catalog._defaults()
+            return Catalog._snapshot
+        finally:
+            con.close()
+
+        options: dict[str, list] = {kind: list() for kind in Catalog._OPTION_KINDS}
+        for kind, value in rows:
+            options.setdefault(kind, list()).append(int(value) if kind == "engine_displacement" else value)
+
+        Catalog._snapshot = CatalogSnapshot(
+            version=version,
+            car_types=tuple(options["car_type"]),
+            rim_types=tuple(options["rim_type"]),
+            engine_displacements=tuple(options["engine_displacement"]),
+            pay_methods=tuple(options["pay_method"]),
+            branches=tuple(options["branch"]),
+            prices={(branch, car_type, rim_type, int(engine)): price
+                    for branch, car_type, rim_type, engine, price in availability})
+        return Catalog._snapshot
+
+    @staticmethod
+    def get() -> CatalogSnapshot:
+        """
+        Returns the cached snapshot, loading it on first use.
+
+        Returns:
+            CatalogSnapshot: The cached snapshot.
+        """
+        return Catalog._snapshot or Catalog.load()
+
+    @staticmethod
+    def reload_if_changed() -> CatalogSnapshot:
+        """
+        Reloads the snapshot if the catalog changed since it was loaded.
+
+        Returns:
+            CatalogSnapshot: The up to date snapshot.
+        """
+        if Catalog._snapshot is None or Catalog._snapshot.version != Catalog.version():
+            return Catalog.load()
+        return Catalog._snapshot
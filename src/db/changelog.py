@@ -0,0 +1,149 @@
+"""This module provides the Changelog class, which records every change to
+users and driver_test so a backup can be rolled forward to a point in time.
+
+Triggers append one row per inserted, updated or deleted record to the
+`changelog` table, with the full new row (or the id, for deletions) as JSON.
+"""
+
+import json
+import sqlite3
+from typing import Optional
+
+from src.db.database import Database
+
+TABLES: dict[str, tuple[str, ...]] = {
+    "users": ("id", "name", "phone_number"),
+    "driver_test": ("id", "test_day", "test_hour", "car_type", "rim_type", "engine_displacement",
+                    "external_color", "internal_color", "available", "driver_id", "branch"),
+}
+
+
+class Changelog:
+    """Change history of the users and driver_test tables."""
+
+    @staticmethod
+    def _schema() -> str:
+        """Builds the changelog table and the triggers of every logged table."""
+        script: str = """
+            CREATE TABLE IF NOT EXISTS changelog (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts TEXT NOT NULL,
+                tbl TEXT NOT NULL,
+                op TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                data TEXT
+            );
+        """
+        for table, columns in TABLES.items():
+            row: str = ", ".join(f"'{column}', new.{column}" for column in columns)
+            for event, row_id, data in (("INSERT", "new.id", f"json_object({row})"),
+                                        ("UPDATE", "new.id", f"json_object({row})"),
+                                        ("DELETE", "old.id", "NULL")):
+                script += f"""
+                    CREATE TRIGGER IF NOT EXISTS changelog_{table}_{event.lower()} AFTER {event} ON {table} BEGIN
+                        INSERT INTO changelog(ts, tbl, op, row_id, data)
+                        VALUES (strftime('%Y-%m-%d %H:%M:%f', 'now'), '{table}', '{event}', {row_id}, {data});
+                    END;
+                """
+            # An update changing the id also removes the old row.
+            script += f"""
+                CREATE TRIGGER IF NOT EXISTS changelog_{table}_rekey AFTER UPDATE OF id ON {table}
+                WHEN old.id != new.id BEGIN
+                    INSERT INTO changelog(ts, tbl, op, row_id, data)
+                    VALUES (strftime('%Y-%m-%d %H:%M:%f', 'now'), '{table}', 'DELETE', old.id, NULL);
+                END;
+            """
+        return script
+
+    @staticmethod
+    def create() -> None:
+        """
+        Creates the changelog table and starts logging changes.
+        """
+        Database.create_tables()
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            con.executescript(Changelog._schema())
+        finally:
+            con.close()
+
+    @staticmethod
+    def last_seq(con: sqlite3.Connection) -> Optional[int]:
+        """
+        Returns the sequence number of the last change in a database.
+
+        Args:
+            con (sqlite3.Connection): Connection to the database.
+
+        Returns:
+            Optional[int]: The last sequence number, 0 if nothing was logged yet,
+            or None if the database has no changelog.
+        """
+        try:
+            return con.execute("SELECT IFNULL(MAX(seq), 0) FROM changelog").fetchone()[0]
+        except sqlite3.OperationalError:
+            return None
+
+    @staticmethod
+    def prune(up_to: int, batch_size: int = 5000) -> int:
+        """
+        Deletes the changes of the current database up to a sequence number.
+
+        Changes are deleted a batch at a time, so bookings are never held
+        back for long.
+
+        Args:
+            up_to (int): Last sequence number deleted, included.
+            batch_size (int): Maximum number of changes deleted per transaction.
+
+        Returns:
+            int: The number of changes deleted.
+        """
+        con: sqlite3.Connection = Database.open_connection()
+        deleted: int = 0
+        try:
+            while True:
+                cursor: sqlite3.Cursor = con.execute(
+                    "DELETE FROM changelog WHERE seq IN (SELECT seq FROM changelog WHERE seq <= ? LIMIT ?)",
+                    (up_to, batch_size))
+                con.commit()
+                deleted += cursor.rowcount
+                if cursor.rowcount < batch_size:
+                    return deleted
+        finally:
+            con.close()
+
+    @staticmethod
+    def replay(target: sqlite3.Connection, changes: list[tuple[int, str, str, str, int, Optional[str]]]) -> None:
+        """
+        Applies logged changes to another database, in order.
+
+        The target's own triggers log the replayed writes again, so those
+        entries are replaced by the original ones, keeping their sequence
+        numbers and timestamps.
+
+        Args:
+            target (sqlite3.Connection): Connection to the database to roll forward.
+            changes (list[tuple[int, str, str, str, int, Optional[str]]]): The
+            (seq, ts, tbl, op, row_id, data) changelog rows to apply.
+        """
+        if not changes:
+            return
+        with target:
+            for _, _, table, op, row_id, data in changes:
+                if op == "DELETE":
+                    target.execute(f"DELETE FROM {table} WHERE id = ?", (row_id,))
+                else:
+                    row: dict = json.loads(data)
+                    columns: tuple[str, ...] = TABLES[table]
+                    values: list = [row[column] for column in columns]
+                    # UPDATE first, so triggers on the target see a real update.
+                    cursor: sqlite3.Cursor = target.execute(
+                        f"UPDATE {table} SET {', '.join(column + ' = ?' for column in columns)} WHERE id = ?",
+                        values + [row_id])
+                    if cursor.rowcount == 0:
+                        target.execute(f"INSERT INTO {table}({', '.join(columns)}) "
+                                       f"VALUES ({', '.join('?' * len(columns))})", values)
+            target.execute("DELETE FROM changelog WHERE seq >= ?", (changes[0][0],))
+            target.executemany("INSERT INTO changelog(seq, ts, tbl, op, row_id, data) VALUES (?, ?, ?, ?, ?, ?)",
+                               changes)
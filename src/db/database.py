@@ -1,7 +1,9 @@
 """This module provides a Database class for interacting directly with
 an SQLite database file."""
 
+import itertools
 import sqlite3
+import threading
 from typing import Optional
 import datetime
 
@@ -11,27 +13,168 @@ from src.utils.color import Color
 from src.models.driver_test import DriverTest
 from src.exceptions import diver_test_exceptions
 from src.models.car import Car
+from src.db.replica import ReplicaManager
+from src.utils.tracing import traced
 
-class Database:
+class _PerThreadConnection(type):
+    """Metaclass storing `_con` and `_cur` per thread, so the methods of
+    `Database` can run in several threads at once without sharing a connection."""
+
+    _local: threading.local = threading.local()
+
+    @property
+    def _con(cls) -> Optional[sqlite3.Connection]:
+        return getattr(cls._local, "con", None)
+
+    @_con.setter
+    def _con(cls, value: Optional[sqlite3.Connection]) -> None:
+        cls._local.con = value
+
+    @property
+    def _cur(cls) -> Optional[sqlite3.Cursor]:
+        return getattr(cls._local, "cur", None)
+
+    @_cur.setter
+    def _cur(cls, value: Optional[sqlite3.Cursor]) -> None:
+        cls._local.cur = value
+
+
+class Database(metaclass=_PerThreadConnection):
     """
     A class to interact directly with the SQLite database file.
 
     Attributes:
         _con (Optional[sqlite3.Connection]): A connection object representing
-        the SQLite database connection.
-        _cur (Optional[sqlite3.Cursor]): A cursor object used to execute SQL commands.
+        the SQLite database connection, one per thread.
+        _cur (Optional[sqlite3.Cursor]): A cursor object used to execute SQL
+        commands, one per thread.
+        _replicas (Optional[ReplicaManager]): Replica used for reporting reads,
+        if one has been configured.
     """
     __DATABASE_URL = "src/db/app.db"
+    # Keeps in-memory databases alive between connections.
+    __keeper: Optional[sqlite3.Connection] = None
+    __memory_ids = itertools.count()
+
+    _replicas: Optional[ReplicaManager] = None
+
+    @staticmethod
+    def set_database_url(url: str) -> None:
+        """
+        Points the Database class at a different SQLite database.
+
+        Args:
+            url (str): Path of an SQLite database file, ":memory:" for a new
+            in-memory database shared by every connection of this process, or
+            an SQLite URI such as "file:app.db?mode=ro". Shared-cache URIs
+            ("cache=shared") are not supported: they lock whole tables and
+            fail at once with "database table is locked" under concurrent
+            writes, instead of waiting for the busy timeout.
+        """
+        if Database.__keeper:
+            Database.__keeper.close()
+            Database.__keeper = None
+
+        if url == ":memory:":
+            # The memdb VFS shares one in-memory database between connections
+            # and, unlike shared cache, uses the normal locking and busy timeout.
+            url = f"file:/dealership-{next(Database.__memory_ids)}?vfs=memdb"
+        Database.__DATABASE_URL = url
+        if "vfs=memdb" in url or "mode=memory" in url:
+            Database.__keeper = Database.open_connection()
+
+    @staticmethod
+    def get_database_url() -> str:
+        """
+        Returns the path or URI of the SQLite database in use.
+
+        Returns:
+            str: Path or URI of the SQLite database.
+        """
+        return Database.__DATABASE_URL
+
+    @staticmethod
+    def open_connection() -> sqlite3.Connection:
+        """
+        Opens an independent connection to the SQLite database file.
+
+        Unlike `_connect`, the connection is not stored on the class, so it
+        can be used safely from several threads or processes at once.
+
+        Returns:
+            sqlite3.Connection: A new connection owned by the caller.
+        """
+        return sqlite3.connect(Database.__DATABASE_URL, timeout=30,
+                               uri=Database.__DATABASE_URL.startswith("file:"))
+
+    @staticmethod
+    def create_tables() -> None:
+        """
+        Creates the users and driver_test tables if they do not exist yet.
+
+        The schema matches the one documented in docs/database.txt. Databases
+        created before driver_test had a branch column are migrated.
+
+        The database is switched to WAL mode, so readers, replicas and backups
+        never block bookings.
+        """
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.executescript("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT,
+                    phone_number INTEGER
+                );
+
+                CREATE TABLE IF NOT EXISTS driver_test(
+                    id INTEGER PRIMARY KEY,
+                    test_day DATE,
+                    test_hour TIME,
+                    car_type TEXT,
+                    rim_type TEXT,
+                    engine_displacement TEXT,
+                    external_color TEXT,
+                    internal_color TEXT,
+                    available INTEGER,
+                    driver_id INTEGER,
+                    branch TEXT,
+                    FOREIGN KEY (driver_id) REFERENCES users(id)
+                );
+            """)
+            columns: list[str] = [i[1] for i in con.execute("PRAGMA table_info(driver_test)")]
+            if "branch" not in columns:
+                con.execute("ALTER TABLE driver_test ADD COLUMN branch TEXT")
+                con.commit()
+        finally:
+            con.close()
 
-    _con: Optional[sqlite3.Connection] = None
-    _cur: Optional[sqlite3.Cursor] = None
+    @staticmethod
+    def use_replicas(replicas: Optional[ReplicaManager]) -> None:
+        """
+        Routes reporting reads to a replica.
+
+        Args:
+            replicas (Optional[ReplicaManager]): The replica to read from, or
+            None to send every query to the primary database again.
+        """
+        Database._replicas = replicas
 
     @staticmethod
-    def _connect():
+    def _connect(read_only: bool = False):
         """
         Establishes a connection to the SQLite database file.
+
+        Args:
+            read_only (bool): Whether the caller only reads. Read-only callers
+            are served by the replica when it is within its staleness bound.
         """
-        Database._con = sqlite3.connect(Database.__DATABASE_URL)
+        Database._con = None
+        if read_only and Database._replicas:
+            Database._con = Database._replicas.connect()
+        if Database._con is None:
+            Database._con = Database.open_connection()
         Database._cur = Database._con.cursor()
 
     @staticmethod
@@ -45,6 +188,7 @@ class Database:
             Database._con.close()
 
     @staticmethod
+    @traced("db")
     def add_user(name: str, phone_number: int) -> None:
         """
         Adds a user to the database.
@@ -60,6 +204,9 @@ class Database:
         """
         Database._connect()
         try:
+            # Take the write lock before checking, so two users cannot both
+            # pass the check with the same phone number.
+            Database._cur.execute("BEGIN IMMEDIATE")
             query = "SELECT name FROM users WHERE phone_number = :phone_number"
             Database._cur.execute(query, {"phone_number": phone_number})
             result: list[tuple[str]] = Database._cur.fetchall()
@@ -74,6 +221,7 @@ class Database:
             Database._disconnect()
 
     @staticmethod
+    @traced("db")
     def del_user(phone_number: int) -> None:
         """
         Deletes a user from the database based on their phone number.
@@ -100,6 +248,7 @@ class Database:
             Database._disconnect()
 
     @staticmethod
+    @traced("db")
     def edit_user(phone_number: int,
                   name: Optional[str] = None,
                   new_phone_number: Optional[int] = None) -> None:
@@ -118,6 +267,7 @@ class Database:
         """
         Database._connect()
         try:
+            Database._cur.execute("BEGIN IMMEDIATE")
             query = "SELECT name FROM users WHERE phone_number = :phone_number"
             Database._cur.execute(query, {"phone_number": phone_number})
             result: list[tuple[str]] = Database._cur.fetchall()
@@ -148,6 +298,7 @@ class Database:
             Database._disconnect()
 
     @staticmethod
+    @traced("db")
     def get_all_users() -> list[User]:
         """
         Retrieves all users from the database.
@@ -159,7 +310,7 @@ class Database:
             DatabaseError: If there is an error in executing the SQL query or fetching the data.
         """
         try:
-            Database._connect()
+            Database._connect(read_only=True)
             query: str = "SELECT id, name, phone_number FROM users"
             Database._cur.execute(query)
             result_query: list[tuple[int, str, int]] = Database._cur.fetchall()
@@ -170,6 +321,7 @@ class Database:
             Database._disconnect()
 
     @staticmethod
+    @traced("db")
     def get_user(phone_number: int, name: Optional[str] = None) -> User:
         """method docstring"""
         try:
@@ -194,6 +346,7 @@ class Database:
             Database._disconnect()
 
     @staticmethod
+    @traced("db")
     def user_exist(name: str, phone_number: int) -> bool:
         """method docstring"""
         try:
@@ -210,6 +363,7 @@ class Database:
             Database._disconnect()
 
     @staticmethod
+    @traced("db")
     def add_driver_test(test_day: datetime.date,
                         test_hour: datetime.time,
                         car_type: str,
@@ -217,7 +371,8 @@ class Database:
                         engine_displacement: int,
                         external_color: Color,
                         internal_color: Color,
-                        driver_id: Optional[int] = None) -> None:
+                        driver_id: Optional[int] = None,
+                        branch: Optional[str] = None) -> None:
         """
         Adds a driver test to the database.
 
@@ -231,6 +386,7 @@ class Database:
             internal_color (Color): The internal color of the car in RGB format.
             available (int): Availability status (default is 1).
             driver_id (Optional[int]): The ID of the driver (must exist in users table or can be None).
+            branch (Optional[str]): The branch (one of `Purchase.SEDES`) where the test takes place.
 
         Note:
             If driver_id is None, the available field will automatically be set to 1 (true).
@@ -244,19 +400,48 @@ class Database:
 
             query = '''
                 INSERT INTO driver_test (test_day, test_hour, car_type, rim_type, engine_displacement,
-                                        external_color, internal_color, available, driver_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                                        external_color, internal_color, available, driver_id, branch)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             '''
             Database._cur.execute(query, (test_day.isoformat(), test_hour.isoformat(),
                                           car_type, rim_type,
                                           engine_displacement, str(external_color),
                                           str(internal_color),
-                                          available, driver_id))
+                                          available, driver_id, branch))
             Database._con.commit()
         finally:
             Database._disconnect()
 
     @staticmethod
+    @traced("db")
+    def add_driver_tests(slots: list[tuple[datetime.date, datetime.time, str, str, int,
+                                           Color, Color, Optional[str]]]) -> None:
+        """
+        Adds many free driver test slots in a single transaction.
+
+        Args:
+            slots (list[tuple[datetime.date, datetime.time, str, str, int, Color, Color, Optional[str]]]):
+            The slots as (test_day, test_hour, car_type, rim_type,
+            engine_displacement, external_color, internal_color, branch), with
+            the same meaning as the arguments of `add_driver_test`.
+        """
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            query = '''
+                INSERT INTO driver_test (test_day, test_hour, car_type, rim_type, engine_displacement,
+                                        external_color, internal_color, available, driver_id, branch)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 1, NULL, ?)
+            '''
+            con.executemany(query, ((test_day.isoformat(), test_hour.isoformat(), car_type, rim_type,
+                                     engine_displacement, str(external_color), str(internal_color), branch)
+                                    for test_day, test_hour, car_type, rim_type, engine_displacement,
+                                    external_color, internal_color, branch in slots))
+            con.commit()
+        finally:
+            con.close()
+
+    @staticmethod
+    @traced("db")
     def get_all_dates() -> list[datetime.date]:
         """
         Retrieves all unique test dates from the driver_test table
@@ -264,9 +449,9 @@ class Database:
         Returns
             List[datetime.date]: A list fo uniqued test dates
         """
-        Database._connect()
+        Database._connect(read_only=True)
         try:
-            query = "SELECT DISTINC test_day FROM driver_test"
+            query = "SELECT DISTINCT test_day FROM driver_test"
             Database._cur.execute(query)
             result_query: list[tuple[str]] = Database._cur.fetchall()
             unique_dates: list[datetime.date] = [datetime.date.fromisoformat(date[0]) for date in result_query]
@@ -275,6 +460,7 @@ class Database:
             Database._disconnect()
 
     @staticmethod
+    @traced("db")
     def get_available_datetime() -> dict[datetime.date, list[datetime.time]]:
         """
         Retrives all available hour by day from the driver_test table.
@@ -283,7 +469,7 @@ class Database:
             dict[datetime.date, list[datetime.time]] A dictionary where keys are dates
             and values are lists of available hours for each date.
         """
-        Database._connect()
+        Database._connect(read_only=True)
         try:
             query = "SELECT test_day, test_hour FROM driver_test WHERE available = 1"
             Database._cur.execute(query)
@@ -304,6 +490,7 @@ class Database:
             Database._disconnect()
 
     @staticmethod
+    @traced("db")
     def get_available_driver_test(car: Car, date: datetime.date, hour: datetime.time):
         """metod docstring"""
         try:
@@ -320,6 +507,7 @@ class Database:
         finally:
             Database._disconnect()
     @staticmethod
+    @traced("db")
     def book_driver_test(user: User, driver_test: DriverTest) -> None:
         """
         Books a driver test for a user at a specific date and time.
@@ -333,22 +521,51 @@ class Database:
 
         Database._connect()
         try:
-            # Confirm that the space is available
-            query: str = "SELECT available FROM driver_test WHERE id = ?"
-            Database._cur.execute(query, (driver_test.get_id(),))
-            result_query: list[tuple[int]] = Database._cur.fetchall()
+            # Only take the space if it is still available
+            query: str = "UPDATE driver_test SET available = 0, driver_id = ? WHERE id = ? AND available = 1"
+            Database._cur.execute(query, (user.get_id(), driver_test.get_id()))
 
-            if not result_query[0][0]:
+            if Database._cur.rowcount != 1:
                 raise diver_test_exceptions.NoAvaliableDriverTest
 
-            query = "UPDATE driver_test SET available = 0, driver id = ? WHERE id = ?"
-            Database._cur.execute(query, (user.get_id(), driver_test.get_id()))
             Database._con.commit()
 
         finally:
             Database._disconnect()
 
+    @staticmethod
+    @traced("db")
+    def book_driver_tests(bookings: list[tuple[int, int]]) -> list[bool]:
+        """
+        Books several driver tests in a single transaction.
+
+        Each slot is only taken if it is still available, so two bookings
+        for the same slot never both succeed, even across connections.
+
+        Args:
+            bookings (list[tuple[int, int]]): Pairs of (user id, driver test id).
+
+        Returns:
+            list[bool]: For each booking, True if the slot was booked and
+            False if it was no longer available.
+        """
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            cur: sqlite3.Cursor = con.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            query: str = "UPDATE driver_test SET available = 0, driver_id = ? WHERE id = ? AND available = 1"
+            result: list[bool] = list()
+            for user_id, driver_test_id in bookings:
+                cur.execute(query, (user_id, driver_test_id))
+                result.append(cur.rowcount == 1)
+            con.commit()
+            return result
+        except sqlite3.Error:
+            con.rollback()
+            raise
+        finally:
+            con.close()
+
 
 if __name__ == '__main__':
-    # agregar la lógica para crear la tabla
-    pass
+    Database.create_tables()
@@ -0,0 +1,353 @@
+"""This module provides DemandForecast, which predicts how many driver tests
+will be booked per branch, car type, weekday and hour, and recommends how
+many slots each branch should publish in the coming weeks.
+
+Booking history is read in one bulk load and turned into NumPy columns.
+Bookings are counted into a (branch, car type, weekday, hour, week) cube
+with a single `bincount`, and every weekday/hour series is then smoothed at
+once, either by averaging the last weeks or by exponential smoothing.
+
+Usage:
+    python -m src.db.forecast recommend [--weeks 4] [--create]
+    python -m src.db.forecast bench [--years 3]
+"""
+
+import argparse
+from dataclasses import dataclass
+import datetime
+import math
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Iterable, Literal, Optional
+
+import numpy as np
+
+from src.db.archive import SlotArchive
+from src.db.catalog import Catalog
+from src.db.database import Database
+from src.utils.color import Color
+
+# Day number, counted from 1970-01-01, of the Monday 1970-01-05.
+_FIRST_MONDAY: int = 4
+
+
+def _day_number(day: datetime.date) -> int:
+    """Returns the number of days from 1970-01-01 to `day`."""
+    return int(np.datetime64(day, "D").astype(np.int64))
+
+
+@dataclass
+class SlotRecommendation:
+    """Represents how many slots a branch should publish for a car type at a given hour.
+
+    Attributes:
+        test_day (datetime.date): The day of the slots.
+        test_hour (datetime.time): The hour of the slots.
+        branch (Optional[str]): The branch, or None for slots without branch.
+        car_type (str): The car type.
+        expected (float): The forecast number of bookings.
+        slots (int): The recommended number of slots.
+    """
+
+    test_day: datetime.date
+    test_hour: datetime.time
+    branch: Optional[str]
+    car_type: str
+    expected: float
+    slots: int
+
+
+class DemandForecast:
+    """
+    Weekly-seasonal demand model fitted on booking history.
+
+    Attributes:
+        branches (np.ndarray): Branch of each row of the model.
+        car_types (np.ndarray): Car type of each column of the model.
+        demand (Optional[np.ndarray]): Expected bookings per week, shaped
+        (branch, car type, weekday, hour), once fitted.
+    """
+
+    def __init__(self) -> None:
+        self.branches: np.ndarray = np.array([], dtype=object)
+        self.car_types: np.ndarray = np.array([], dtype=object)
+        self.demand: Optional[np.ndarray] = None
+
+    @staticmethod
+    def load(since: datetime.date,
+             until: datetime.date,
+             archive: Optional[SlotArchive] = None) -> tuple[np.ndarray, ...]:
+        """
+        Loads the booked slots between two days as NumPy columns.
+
+        Args:
+            since (datetime.date): First day of history, included.
+            until (datetime.date): Last day of history, included.
+            archive (Optional[SlotArchive]): Archive to read older slots from.
+
+        Returns:
+            tuple[np.ndarray, ...]: Day numbers since 1970-01-01, hours,
+            branches and car types, one entry per booking.
+        """
+        if archive:
+            # The archive history already includes the live table.
+            rows: list[tuple] = [(row[1], row[2], row[10], row[3]) for row in archive.history(since, until)
+                                 if row[9] is not None]
+        else:
+            con: sqlite3.Connection = Database.open_connection()
+            try:
+                rows = con.execute("""
+                    SELECT test_day, test_hour, branch, car_type FROM driver_test
+                    WHERE driver_id IS NOT NULL AND test_day BETWEEN ? AND ?
+                """, (since.isoformat(), until.isoformat())).fetchall()
+            finally:
+                con.close()
+
+        if not rows:
+            return (np.array([], dtype=np.int64), np.array([], dtype=np.int64),
+                    np.array([], dtype=object), np.array([], dtype=object))
+        days, hours, branches, car_types = zip(*rows)
+        return (np.array(days, dtype="datetime64[D]").astype(np.int64),
+                np.array(hours, dtype="U8").astype("U2").astype(np.int64),
+                np.array(branches, dtype=object),
+                np.array(car_types, dtype=object))
+
+    def fit(self,
+            days: np.ndarray,
+            hours: np.ndarray,
+            branches: np.ndarray,
+            car_types: np.ndarray,
+            since: Optional[datetime.date] = None,
+            until: Optional[datetime.date] = None,
+            method: Literal["smoothing", "average"] = "smoothing",
+            alpha: float = 0.3,
+            window: int = 8) -> "DemandForecast":
+        """
+        Fits the weekly demand of every branch, car type, weekday and hour.
+
+        Only the Monday to Sunday weeks lying entirely between `since` and
+        `until` are used, so partial weeks at either end of the history do
+        not count their missing days as days without bookings, while weeks
+        without any booking inside the range do count.
+
+        Args:
+            days (np.ndarray): Day number of each booking.
+            hours (np.ndarray): Hour of each booking.
+            branches (np.ndarray): Branch of each booking.
+            car_types (np.ndarray): Car type of each booking.
+            since (Optional[datetime.date]): First day of the history.
+            Defaults to the day of the first booking.
+            until (Optional[datetime.date]): Last complete day of the history.
+            Defaults to the day of the last booking.
+            method (Literal["smoothing", "average"]): Exponential smoothing
+            over all weeks, or the mean of the last `window` weeks.
+            alpha (float): Smoothing factor, weight of the newest week.
+            window (int): Number of weeks averaged by the "average" method.
+
+        Returns:
+            DemandForecast: The fitted model itself.
+        """
+        if len(days) == 0:
+            self.demand = np.zeros((0, 0, 7, 24))
+            return self
+
+        # None cannot be sorted against strings, so missing values become ''.
+        self.branches, branch_index = np.unique([branch or "" for branch in branches], return_inverse=True)
+        self.car_types, car_index = np.unique([car_type or "" for car_type in car_types], return_inverse=True)
+
+        first_day: int = _day_number(since) if since else int(days.min())
+        last_day: int = _day_number(until) if until else int(days.max())
+        first_week: int = -((_FIRST_MONDAY - first_day) // 7)
+        last_week: int = (last_day - _FIRST_MONDAY + 1) // 7 - 1
+        shape: tuple[int, ...] = (len(self.branches), len(self.car_types), 7, 24, max(0, last_week - first_week + 1))
+        if shape[-1] == 0:
+            self.demand = np.zeros(shape[:-1])
+            return self
+
+        weeks: np.ndarray = (days - _FIRST_MONDAY) // 7
+        complete: np.ndarray = (weeks >= first_week) & (weeks <= last_week)
+        branch_index, car_index, hours = branch_index[complete], car_index[complete], hours[complete]
+        week_index: np.ndarray = weeks[complete] - first_week
+        weekday: np.ndarray = (days[complete] - _FIRST_MONDAY) % 7
+
+        cell: np.ndarray = np.ravel_multi_index((branch_index, car_index, weekday, hours, week_index), shape)
+        counts: np.ndarray = np.bincount(cell, minlength=math.prod(shape)).reshape(shape).astype(float)
+
+        if method == "average":
+            self.demand = counts[..., -window:].mean(axis=-1)
+        else:
+            level: np.ndarray = counts[..., 0]
+            for week in range(1, shape[-1]):
+                level = alpha * counts[..., week] + (1 - alpha) * level
+            self.demand = level
+        return self
+
+    def recommend(self,
+                  start: datetime.date,
+                  weeks: int = 4,
+                  headroom: float = 0.2,
+                  hours: Iterable[int] = range(8, 13)) -> list[SlotRecommendation]:
+        """
+        Recommends slot counts for the coming weeks.
+
+        Args:
+            start (datetime.date): First day to publish slots for.
+            weeks (int): Number of weeks to cover.
+            headroom (float): Fraction of extra slots over the expected demand.
+            hours (Iterable[int]): Hours at which slots are offered.
+
+        Returns:
+            list[SlotRecommendation]: One entry per day, hour, branch and car
+            type with at least one recommended slot.
+        """
+        result: list[SlotRecommendation] = list()
+        hours = list(hours)
+        slots: np.ndarray = np.ceil(self.demand * (1 + headroom) - 1e-9).astype(int)
+        for offset in range(weeks * 7):
+            day: datetime.date = start + datetime.timedelta(days=offset)
+            weekday: int = day.weekday()
+            for b, c, h in zip(*np.nonzero(slots[:, :, weekday, hours])):
+                hour: int = hours[h]
+                result.append(SlotRecommendation(test_day=day,
+                                                 test_hour=datetime.time(hour),
+                                                 branch=str(self.branches[b]) or None,
+                                                 car_type=str(self.car_types[c]),
+                                                 expected=float(self.demand[b, c, weekday, hour]),
+                                                 slots=int(slots[b, c, weekday, hour])))
+        return result
+
+    @staticmethod
+    def create_slots(recommendations: list[SlotRecommendation],
+                     rim_type: str,
+                     engine_displacement: int,
+                     external_color: Color,
+                     internal_color: Color) -> int:
+        """
+        Publishes the slots still missing to meet the recommendations.
+
+        Slots already published for the same day, hour, branch and car type
+        count towards the recommendation, so running it twice adds nothing.
+
+        Args:
+            recommendations (list[SlotRecommendation]): The recommendations.
+            rim_type (str): Rim type of the new slots.
+            engine_displacement (int): Engine displacement of the new slots.
+            external_color (Color): External color of the new slots.
+            internal_color (Color): Internal color of the new slots.
+
+        Returns:
+            int: The number of slots created.
+        """
+        if not recommendations:
+            return 0
+        first: datetime.date = min(r.test_day for r in recommendations)
+        last: datetime.date = max(r.test_day for r in recommendations)
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            existing: dict[tuple, int] = {
+                (day, hour, branch, car_type): count for day, hour, branch, car_type, count in con.execute("""
+                    SELECT test_day, test_hour, branch, car_type, COUNT(*) FROM driver_test
+                    WHERE test_day BETWEEN ? AND ? GROUP BY 1, 2, 3, 4
+                """, (first.isoformat(), last.isoformat()))}
+        finally:
+            con.close()
+
+        slots: list[tuple] = list()
+        for r in recommendations:
+            key: tuple = (r.test_day.isoformat(), r.test_hour.isoformat(), r.branch, r.car_type)
+            missing: int = r.slots - existing.get(key, 0)
+            slots += [(r.test_day, r.test_hour, r.car_type, rim_type, engine_displacement,
+                       external_color, internal_color, r.branch)] * max(0, missing)
+        Database.add_driver_tests(slots)
+        return len(slots)
+
+
+def bench(years: int = 3) -> None:
+    """
+    Times loading and fitting a synthetic booking history.
+
+    Args:
+        years (int): Years of history to generate.
+    """
+    rng: np.random.Generator = np.random.default_rng(0)
+    branches: list[str] = list(Catalog.get().branches)
+    car_types: list[str] = list(Catalog.get().car_types)
+    end: datetime.date = datetime.date.today()
+    start: datetime.date = end - datetime.timedelta(days=365 * years)
+
+    with tempfile.TemporaryDirectory() as directory:
+        Database.set_database_url(os.path.join(directory, "forecast.db"))
+        Database.create_tables()
+        day_numbers: np.ndarray = np.arange(np.datetime64(start), np.datetime64(end)).astype(np.int64)
+        rows: list[tuple] = list()
+        for day in day_numbers:
+            count: int = int(rng.poisson(200))
+            day_text: str = str(np.datetime64(int(day), "D"))
+            for hour, branch, car_type in zip(rng.integers(8, 13, count),
+                                              rng.choice(branches, count),
+                                              rng.choice(car_types, count)):
+                rows.append((day_text, f"{hour:02d}:00:00", car_type, str(branch), 1))
+        con: sqlite3.Connection = Database.open_connection()
+        con.executemany("""INSERT INTO driver_test(test_day, test_hour, car_type, branch, driver_id, available)
+                           VALUES (?, ?, ?, ?, ?, 0)""", rows)
+        con.commit()
+        con.close()
+
+        started: float = time.perf_counter()
+        columns: tuple[np.ndarray, ...] = DemandForecast.load(start, end)
+        loaded: float = time.perf_counter()
+        model: DemandForecast = DemandForecast().fit(*columns, since=start, until=end - datetime.timedelta(days=1))
+        fitted: float = time.perf_counter()
+        model.recommend(end, weeks=4)
+        recommended: float = time.perf_counter()
+
+    print(f"{len(rows)} bookings over {years} years")
+    print(f"load {loaded - started:.2f} s, fit {fitted - loaded:.2f} s, "
+          f"recommend {recommended - fitted:.2f} s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Forecast test drive demand and size slot inventory.")
+    parser.add_argument("command", choices=("recommend", "bench"))
+    parser.add_argument("--database", default=Database.get_database_url())
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--weeks", type=int, default=4)
+    parser.add_argument("--method", choices=("smoothing", "average"), default="smoothing")
+    parser.add_argument("--headroom", type=float, default=0.2)
+    parser.add_argument("--archive-dir", help="also read archived slots from this directory")
+    parser.add_argument("--create", action="store_true", help="publish the missing slots")
+    parser.add_argument("--years", type=int, default=3, help="years of synthetic history for bench")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        bench(args.years)
+        return
+
+    Database.set_database_url(args.database)
+    today: datetime.date = datetime.date.today()
+    # Today is not over yet, so the history ends yesterday.
+    since: datetime.date = today - datetime.timedelta(days=args.history_days)
+    until: datetime.date = today - datetime.timedelta(days=1)
+    archive: Optional[SlotArchive] = SlotArchive(args.archive_dir) if args.archive_dir else None
+    model: DemandForecast = DemandForecast().fit(*DemandForecast.load(since, until, archive),
+                                                 since=since, until=until, method=args.method)
+    recommendations: list[SlotRecommendation] = model.recommend(today + datetime.timedelta(days=1),
+                                                                args.weeks, args.headroom)
+    for r in recommendations:
+        print(f"{r.test_day} {r.test_hour:%H:%M} {r.branch or '-':<10} {r.car_type:<10} "
+              f"expected {r.expected:5.2f}  slots {r.slots}")
+
+    if args.create:
+        catalog = Catalog.get()
+        created: int = DemandForecast.create_slots(recommendations,
+                                                   rim_type=catalog.rim_types[0],
+                                                   engine_displacement=catalog.engine_displacements[0],
+                                                   external_color=Color(0, 0, 0),
+                                                   internal_color=Color(0, 0, 0))
+        print(f"{created} slots created")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""Correctness and load harness for the Database layer.
+
+`isolated_database` points `Database` at a fresh database (a temporary
+file or a private in-memory database) with the schema created, and restores
+the previous database afterwards. The tests wrap it as pytest fixtures in
+`conftest.py`; it can also be used on its own.
+
+`run_load` drives interleaved user creation, slot creation and booking
+workloads from many threads against the current database, then checks the
+invariants that performance work must preserve and reports throughput.
+
+Usage:
+    python -m src.db.harness --database memory --threads 8 --operations 20000
+"""
+
+import argparse
+from collections import Counter
+import contextlib
+from dataclasses import dataclass, field
+import datetime
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Iterator, Literal
+
+from src.db.availability import DailyAvailability
+from src.db.database import Database
+from src.exceptions import db_exceptions, diver_test_exceptions
+from src.models.driver_test import DriverTest
+from src.models.user import User
+from src.utils.color import Color
+
+
+@contextlib.contextmanager
+def isolated_database(kind: Literal["file", "memory"] = "memory",
+                      summary: bool = True) -> Iterator[str]:
+    """
+    Runs the enclosed code against a fresh, empty database.
+
+    Args:
+        kind (Literal["file", "memory"]): A temporary file or a private
+        in-memory database. Shared-cache URIs are not offered: shared cache
+        locks whole tables and fails at once with "database table is locked"
+        instead of waiting, so concurrent writers always fail on it.
+        summary (bool): Whether to also install the daily_availability
+        summary and its triggers.
+
+    Yields:
+        str: The path or URI of the database.
+    """
+    previous: str = Database.get_database_url()
+    with tempfile.TemporaryDirectory() as directory:
+        if kind == "file":
+            url: str = os.path.join(directory, "harness.db")
+        else:
+            url = ":memory:"
+        try:
+            Database.set_database_url(url)
+            Database.create_tables()
+            if summary:
+                DailyAvailability.create()
+            yield Database.get_database_url()
+        finally:
+            Database.set_database_url(previous)
+
+
+@dataclass
+class LoadReport:
+    """Represents the outcome of a load run.
+
+    Attributes:
+        operations (Counter): Completed operations by kind, including the
+        expected rejections ("user_repeated", "booking_rejected").
+        errors (list[str]): Unexpected exceptions raised by the workers.
+        violations (list[str]): Invariants that did not hold afterwards.
+        seconds (float): Wall time of the run.
+    """
+
+    operations: Counter = field(default_factory=Counter)
+    errors: list[str] = field(default_factory=list)
+    violations: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def throughput(self) -> float:
+        """Returns the completed operations per second."""
+        return sum(self.operations.values()) / self.seconds if self.seconds else 0.0
+
+    def ok(self) -> bool:
+        """Returns whether the run had no errors and no violated invariants."""
+        return not self.errors and not self.violations
+
+
+def check_invariants() -> list[str]:
+    """
+    Checks the invariants of the current database.
+
+    Returns:
+        list[str]: A description of every violated invariant.
+    """
+    violations: list[str] = list()
+    con: sqlite3.Connection = Database.open_connection()
+    try:
+        repeated: list[tuple] = con.execute(
+            "SELECT phone_number, COUNT(*) FROM users GROUP BY phone_number HAVING COUNT(*) > 1").fetchall()
+        violations += [f"phone number {phone} used by {count} users" for phone, count in repeated]
+
+        inconsistent: list[tuple] = con.execute("""
+            SELECT id FROM driver_test
+            WHERE (available = 1 AND driver_id IS NOT NULL) OR (available = 0 AND driver_id IS NULL)
+        """).fetchall()
+        violations += [f"slot {i[0]} availability does not match its driver" for i in inconsistent]
+
+        has_summary: bool = con.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'daily_availability'").fetchone() is not None
+    finally:
+        con.close()
+
+    if has_summary:
+        violations += [f"daily_availability {day} {branch!r} {car_type!r}: summary {stored}, actual {actual}"
+                       for day, branch, car_type, stored, actual in DailyAvailability.verify()]
+    return violations
+
+
+def run_load(threads: int = 8, operations: int = 10000, seed: int = 0) -> LoadReport:
+    """
+    Runs a mixed workload from many threads and checks the result.
+
+    Each worker picks, at random, between creating a user (from a small pool
+    of phone numbers, so duplicates are attempted), creating a slot and
+    booking a slot that other workers may be booking at the same time. Every
+    successful booking is remembered, so a slot booked twice is detected even
+    if the second booking overwrote the first.
+
+    Args:
+        threads (int): Number of worker threads.
+        operations (int): Total number of operations across all workers.
+        seed (int): Seed of the random choices.
+
+    Returns:
+        LoadReport: Counts, errors, violated invariants and timing.
+    """
+    report: LoadReport = LoadReport()
+    lock: threading.Lock = threading.Lock()
+    winners: dict[int, list[int]] = dict()
+    phones: list[int] = [3000000000 + i for i in range(max(1, operations // 4))]
+    day: datetime.date = datetime.date.today() + datetime.timedelta(days=1)
+
+    Database.add_user("harness", 3999999999)
+    Database.add_driver_tests([(day, datetime.time(8), "Sedan", "Sport", 2000,
+                                Color(0, 0, 0), Color(0, 0, 0), "Cali")] * threads)
+
+    def worker(index: int, count: int) -> None:
+        rng: random.Random = random.Random(seed * 1000 + index)
+        done: Counter = Counter()
+        for _ in range(count):
+            action: str = rng.choice(("user", "slot", "book", "book_batch"))
+            try:
+                if action == "user":
+                    phone: int = rng.choice(phones)
+                    Database.add_user(f"user {phone}", phone)
+                elif action == "slot":
+                    Database.add_driver_test(day + datetime.timedelta(days=rng.randrange(30)),
+                                             datetime.time(rng.randrange(8, 13)), "Sedan", "Sport", 2000,
+                                             Color(0, 0, 0), Color(0, 0, 0), branch="Cali")
+                else:
+                    con: sqlite3.Connection = Database.open_connection()
+                    try:
+                        last: int = con.execute("SELECT IFNULL(MAX(id), 0) FROM driver_test").fetchone()[0]
+                        user_id: int = con.execute("SELECT MAX(id) FROM users").fetchone()[0]
+                    finally:
+                        con.close()
+                    # Aim at recent slots so workers compete for the same ones.
+                    slot: int = rng.randint(max(1, last - 2 * threads), last)
+                    if action == "book":
+                        Database.book_driver_test(User(number_id=user_id), DriverTest(number_id=slot))
+                        booked: bool = True
+                    else:
+                        booked = Database.book_driver_tests([(user_id, slot)])[0]
+                    if booked:
+                        with lock:
+                            winners.setdefault(slot, list()).append(user_id)
+                    else:
+                        action = "booking_rejected"
+                done[action] += 1
+            except db_exceptions.PhoneNumberRepeated:
+                done["user_repeated"] += 1
+            except diver_test_exceptions.NoAvaliableDriverTest:
+                done["booking_rejected"] += 1
+            except Exception as error:
+                with lock:
+                    report.errors.append(f"{action}: {type(error).__name__}: {error}")
+        with lock:
+            report.operations.update(done)
+
+    workers: list[threading.Thread] = [
+        threading.Thread(target=worker, args=(i, operations // threads + (i < operations % threads)))
+        for i in range(threads)]
+    start: float = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    report.seconds = time.perf_counter() - start
+
+    report.violations += [f"slot {slot} booked {len(users)} times" for slot, users in winners.items()
+                          if len(users) > 1]
+    report.violations += check_invariants()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a concurrent load against an isolated database.")
+    parser.add_argument("--database", choices=("file", "memory"), default="memory")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with isolated_database(args.database):
+        report: LoadReport = run_load(args.threads, args.operations, args.seed)
+
+    print(f"{sum(report.operations.values())} operations in {report.seconds:.2f} s "
+          f"({report.throughput():.0f} ops/s) on {args.threads} threads")
+    for action, count in sorted(report.operations.items()):
+        print(f"  {action:<17} {count}")
+    for error in report.errors[:20]:
+        print(f"error: {error}")
+    for violation in report.violations[:20]:
+        print(f"violation: {violation}")
+    raise SystemExit(0 if report.ok() else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""This module provides a ReplicaManager that keeps a read-only copy of the
+SQLite database for reporting queries.
+
+The replica is refreshed with the SQLite online backup API, a few pages at
+a time, so the primary database is never locked for the whole copy. Each
+snapshot is written to a staging file and then renamed over the replica,
+so readers always see a complete snapshot.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+def copy_snapshot(source: sqlite3.Connection, target: sqlite3.Connection,
+                  pages: int, sleep: float) -> None:
+    """
+    Copies a database with the online backup API, `pages` pages at a time.
+
+    The backup API restarts whenever another connection writes to the
+    source, so under steady traffic it may never finish. A read transaction
+    is therefore held for the whole copy: in WAL mode the copy then reads
+    one fixed snapshot while writers keep committing. In any other journal
+    mode that read lock would block every booking until the copy ends, so
+    such sources are refused.
+
+    Args:
+        source (sqlite3.Connection): Connection to the database to copy.
+        target (sqlite3.Connection): Connection to the database to overwrite.
+        pages (int): Pages copied per step.
+        sleep (float): Seconds to sleep between steps.
+
+    Raises:
+        ValueError: If the source database is not in WAL mode.
+    """
+    if source.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+        raise ValueError("snapshots need the source database in WAL mode")
+    source.execute("BEGIN")
+    source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+    try:
+        # The `sleep` argument of backup only applies after a busy step, so
+        # the pause between steps is taken in the progress callback.
+        source.backup(target, pages=pages,
+                      progress=lambda status, remaining, total: time.sleep(sleep) if remaining else None)
+    finally:
+        source.rollback()
+
+
+class ReplicaManager:
+    """
+    Periodically snapshots a primary SQLite database into a replica file.
+
+    The primary is switched to WAL mode, which snapshots need to leave
+    bookings unblocked.
+
+    Attributes:
+        _primary_url (str): Path of the primary database file.
+        _replica_url (str): Path of the read-only replica file.
+        _max_staleness (float): Maximum age, in seconds, of a replica that can
+        still serve reads.
+        _interval (float): Seconds between background refreshes.
+        _pages (int): Pages copied per backup step.
+        _step_sleep (float): Seconds to sleep between backup steps, leaving
+        the primary free for writers.
+        _snapshot_time (Optional[float]): Monotonic time at which the current
+        replica snapshot was started, or None if there is no replica yet.
+    """
+
+    def __init__(self,
+                 primary_url: str,
+                 replica_url: str,
+                 max_staleness: float = 60.0,
+                 interval: float = 30.0,
+                 pages: int = 256,
+                 step_sleep: float = 0.005) -> None:
+        self._primary_url: str = primary_url
+        self._replica_url: str = replica_url
+        self._max_staleness: float = max_staleness
+        self._interval: float = interval
+        self._pages: int = pages
+        self._step_sleep: float = step_sleep
+        self._snapshot_time: Optional[float] = None
+        self._lock: threading.Lock = threading.Lock()
+        self._stop: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        primary: sqlite3.Connection = sqlite3.connect(primary_url)
+        try:
+            mode: str = primary.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        finally:
+            primary.close()
+        if mode != "wal":
+            raise ValueError(f"{primary_url} cannot be switched to WAL mode")
+
+    def refresh(self) -> None:
+        """
+        Takes a new snapshot of the primary database.
+
+        The backup runs in steps of `_pages` pages with a pause between steps,
+        and the finished copy atomically replaces the previous replica.
+        """
+        with self._lock:
+            staging_url: str = self._replica_url + ".tmp"
+            started: float = time.monotonic()
+            source: sqlite3.Connection = sqlite3.connect(f"file:{self._primary_url}?mode=ro", uri=True)
+            target: sqlite3.Connection = sqlite3.connect(staging_url)
+            try:
+                copy_snapshot(source, target, self._pages, self._step_sleep)
+            finally:
+                target.close()
+                source.close()
+            os.replace(staging_url, self._replica_url)
+            self._snapshot_time = started
+
+    def staleness(self) -> Optional[float]:
+        """
+        Returns the age of the replica in seconds.
+
+        Returns:
+            Optional[float]: Seconds since the current snapshot was started,
+            or None if no snapshot has been taken yet.
+        """
+        if self._snapshot_time is None:
+            return None
+        return time.monotonic() - self._snapshot_time
+
+    def read_url(self) -> Optional[str]:
+        """
+        Returns the replica to read from, if it is fresh enough.
+
+        Returns:
+            Optional[str]: The path of the replica file, or None if the replica
+            is missing or older than `_max_staleness` and reads must go to the
+            primary database.
+        """
+        staleness: Optional[float] = self.staleness()
+        if staleness is None or staleness > self._max_staleness:
+            return None
+        return self._replica_url
+
+    def connect(self) -> Optional[sqlite3.Connection]:
+        """
+        Opens a read-only connection to the replica, if it is fresh enough.
+
+        Returns:
+            Optional[sqlite3.Connection]: A read-only connection, or None if
+            reads must go to the primary database.
+        """
+        url: Optional[str] = self.read_url()
+        if url is None:
+            return None
+        return sqlite3.connect(f"file:{url}?mode=ro", uri=True)
+
+    def start(self) -> None:
+        """Takes a first snapshot and keeps refreshing it in the background."""
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background refresh."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """Background loop refreshing the replica every `_interval` seconds."""
+        while not self._stop.wait(self._interval):
+            self.refresh()
@@ -0,0 +1,260 @@
+"""This module provides UserSearch, a ranked and paginated customer search
+over the users table.
+
+Three indexes are kept in sync with users by triggers:
+
+* `users_fts`, an FTS5 word index used for prefix matches ("mar gon" finds
+  "María González").
+* `users_trigram`, an FTS5 trigram index used for substring and typo
+  tolerant matches ("gonzales" still finds "González").
+* `users_phone_rev`, the phone digits stored reversed, so a phone number
+  suffix search becomes an indexed prefix range scan.
+
+The triggers only use built-in SQL, so users can keep being written from
+any connection, including the plain `Database` methods and the sqlite3 shell.
+"""
+
+import re
+import sqlite3
+
+from src.db.database import Database
+from src.models.user import User
+
+
+def _reversed_sql(column: str, max_digits: int = 20) -> str:
+    """Builds an SQL expression spelling `column` backwards, one substr per digit."""
+    text: str = f"CAST({column} AS TEXT)"
+    return " || ".join(f"substr({text}, {i}, 1)" for i in range(max_digits, 0, -1))
+
+
+class UserSearch:
+    """Customer search over the users table.
+
+    Attributes:
+        CANDIDATES (int): Maximum number of matches of each trigram clause
+        ranked by a fuzzy search.
+    """
+
+    CANDIDATES: int = 500
+
+    _SCHEMA: str = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+            name, content='users', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        );
+
+        CREATE VIRTUAL TABLE IF NOT EXISTS users_trigram USING fts5(
+            name, content='users', content_rowid='id', tokenize='trigram'
+        );
+
+        CREATE TABLE IF NOT EXISTS users_phone_rev (
+            user_id INTEGER PRIMARY KEY,
+            reversed TEXT
+        );
+
+        CREATE INDEX IF NOT EXISTS users_phone_rev_reversed ON users_phone_rev(reversed);
+
+        CREATE TRIGGER IF NOT EXISTS users_search_insert AFTER INSERT ON users BEGIN
+            INSERT INTO users_fts(rowid, name) VALUES (new.id, new.name);
+            INSERT INTO users_trigram(rowid, name) VALUES (new.id, new.name);
+            INSERT INTO users_phone_rev(user_id, reversed) VALUES (new.id, {new_reversed});
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS users_search_delete AFTER DELETE ON users BEGIN
+            INSERT INTO users_fts(users_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO users_trigram(users_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+            DELETE FROM users_phone_rev WHERE user_id = old.id;
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS users_search_update AFTER UPDATE ON users BEGIN
+            INSERT INTO users_fts(users_fts, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO users_trigram(users_trigram, rowid, name) VALUES ('delete', old.id, old.name);
+            INSERT INTO users_fts(rowid, name) VALUES (new.id, new.name);
+            INSERT INTO users_trigram(rowid, name) VALUES (new.id, new.name);
+            INSERT OR REPLACE INTO users_phone_rev(user_id, reversed)
+                VALUES (new.id, {new_reversed});
+        END;
+    """.format(new_reversed=_reversed_sql("new.phone_number"))
+
+    @staticmethod
+    def _reverse_digits(phone_number) -> str:
+        """Returns the digits of a phone number in reverse order."""
+        return "".join(re.findall(r"\d", str(phone_number)))[::-1]
+
+    @staticmethod
+    def create_index() -> None:
+        """
+        Creates the search indexes and triggers and fills them from users.
+        """
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            con.executescript(UserSearch._SCHEMA)
+            con.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+            con.execute("INSERT INTO users_trigram(users_trigram) VALUES ('rebuild')")
+            con.execute("DELETE FROM users_phone_rev")
+            con.execute("""INSERT INTO users_phone_rev(user_id, reversed)
+                           SELECT id, {} FROM users""".format(_reversed_sql("phone_number")))
+            con.commit()
+        finally:
+            con.close()
+
+    @staticmethod
+    def _quote(token: str) -> str:
+        """Quotes a token as an FTS5 string."""
+        return '"' + token.replace('"', '""') + '"'
+
+    @staticmethod
+    def _fuzzy_clauses(words: list[str]) -> list[str]:
+        """
+        Builds the trigram clauses tolerating a typo in each word.
+
+        A single typo falls in only one half of a word, so a word of six or
+        more characters gives one clause per half ("gonzales" gives "gonz"
+        and "ales"). Shorter words give one clause per pair of consecutive
+        trigrams.
+
+        Args:
+            words (list[str]): The words typed by the staff member.
+
+        Returns:
+            list[str]: FTS5 queries for users_trigram, none if every word is
+            shorter than a trigram.
+        """
+        clauses: list[str] = list()
+        for word in words:
+            if len(word) >= 6:
+                middle: int = len(word) // 2
+                clauses += [UserSearch._quote(word[:middle]), UserSearch._quote(word[middle:])]
+                continue
+            trigrams: list[str] = [UserSearch._quote(word[i:i + 3]) for i in range(len(word) - 2)]
+            if len(trigrams) == 1:
+                clauses.append(trigrams[0])
+            clauses += [f"({first} AND {second})" for first, second in zip(trigrams, trigrams[1:])]
+        return list(dict.fromkeys(clauses))
+
+    @staticmethod
+    def search(text: str, limit: int = 20, offset: int = 0) -> list[User]:
+        """
+        Searches users by name or by the end of their phone number.
+
+        A text made only of digits is matched against the end of the phone
+        numbers. Anything else is matched against names: users whose name
+        words start with every word of the text come first, followed by users
+        sharing trigrams with the text, which tolerates typos and partial
+        words. Each group is ordered by relevance.
+
+        Args:
+            text (str): The text typed by the staff member.
+            limit (int): Maximum number of users returned.
+            offset (int): Number of users to skip, for pagination.
+
+        Returns:
+            list[User]: The matching users, best matches first.
+        """
+        text = text.strip()
+        if not text:
+            return list()
+
+        con: sqlite3.Connection = Database.open_connection()
+        try:
+            digits: str = UserSearch._reverse_digits(text)
+            if re.fullmatch(r"[\d\s+()-]+", text) and digits:
+                ids: list[int] = UserSearch._search_phone(con, digits, limit, offset)
+            else:
+                ids = UserSearch._search_name(con, text, limit, offset)
+
+            if not ids:
+                return list()
+            query: str = f"SELECT id, name, phone_number FROM users WHERE id IN ({', '.join('?' * len(ids))})"
+            users: dict[int, tuple[int, str, int]] = {i[0]: i for i in con.execute(query, ids)}
+            return [User(number_id=users[i][0], name=users[i][1], phone_number=users[i][2])
+                    for i in ids if i in users]
+        finally:
+            con.close()
+
+    @staticmethod
+    def _search_phone(con: sqlite3.Connection, digits: str, limit: int, offset: int) -> list[int]:
+        """
+        Finds the users whose phone number ends with the given digits.
+
+        Args:
+            con (sqlite3.Connection): The connection to query.
+            digits (str): The digits of the suffix, already reversed.
+            limit (int): Maximum number of ids returned.
+            offset (int): Number of ids to skip.
+
+        Returns:
+            list[int]: The matching user ids.
+        """
+        query: str = """
+            SELECT user_id FROM users_phone_rev
+            WHERE reversed >= :prefix AND reversed < :prefix || ':'
+            ORDER BY reversed
+            LIMIT :limit OFFSET :offset
+        """
+        params: dict = {"prefix": digits, "limit": limit, "offset": offset}
+        return [i[0] for i in con.execute(query, params)]
+
+    @staticmethod
+    def _search_name(con: sqlite3.Connection, text: str, limit: int, offset: int) -> list[int]:
+        """
+        Finds the users whose name matches the text, prefix matches first.
+
+        The trigram index is only queried when the prefix matches do not fill
+        the requested page. It is searched in two steps: names holding every
+        clause of the text first, then names holding any clause. Ranking all
+        the names that share a common fragment such as "ales" would cost as
+        much as a scan, so each clause contributes at most `CANDIDATES`
+        matches and the candidates are ranked by their summed bm25 score,
+        which is the bm25 score of the OR of the clauses. A rare clause,
+        which carries the most weight, therefore always contributes all its
+        matches.
+
+        Args:
+            con (sqlite3.Connection): The connection to query.
+            text (str): The text typed by the staff member.
+            limit (int): Maximum number of ids returned.
+            offset (int): Number of ids to skip.
+
+        Returns:
+            list[int]: The matching user ids, best matches first.
+        """
+        words: list[str] = re.findall(r"\w+", text)
+        if not words:
+            return list()
+        prefix: str = " AND ".join(UserSearch._quote(word) + "*" for word in words)
+        query: str = "SELECT rowid FROM users_fts WHERE users_fts MATCH ? ORDER BY rank LIMIT ?"
+        ids: list[int] = [i[0] for i in con.execute(query, (prefix, offset + limit))]
+        if len(ids) == offset + limit:
+            return ids[offset:]
+
+        clauses: list[str] = UserSearch._fuzzy_clauses(words)
+        if not clauses:
+            return ids[offset:]
+        strict: str = " AND ".join(f"({clause})" for clause in clauses)
+        query = """
+            SELECT rowid FROM users_trigram
+            WHERE users_trigram MATCH ?
+            AND rowid NOT IN (SELECT rowid FROM users_fts WHERE users_fts MATCH ?)
+            ORDER BY rank
+            LIMIT ?
+        """
+        ids += [i[0] for i in con.execute(query, (strict, prefix, offset + limit - len(ids)))]
+        if len(ids) == offset + limit or len(clauses) == 1:
+            return ids[offset:]
+
+        candidates: str = " UNION ALL ".join(
+            "SELECT * FROM (SELECT rowid, rank FROM users_trigram WHERE users_trigram MATCH ? LIMIT ?)"
+            for _ in clauses)
+        query = f"""
+            SELECT rowid FROM ({candidates})
+            WHERE rowid NOT IN (SELECT rowid FROM users_fts WHERE users_fts MATCH ?)
+            AND rowid NOT IN (SELECT rowid FROM users_trigram WHERE users_trigram MATCH ?)
+            GROUP BY rowid
+            ORDER BY SUM(rank)
+            LIMIT ?
+        """
+        cap: int = max(UserSearch.CANDIDATES, offset + limit)
+        params: list = [value for clause in clauses for value in (clause, cap)]
+        ids += [i[0] for i in con.execute(query, params + [prefix, strict, offset + limit - len(ids)])]
+        return ids[offset:]
@@ -0,0 +1,99 @@
+"""Benchmark of UserSearch against plain LIKE '%...%' scans.
+
+Fills a scratch database with random customers, builds the search indexes
+and times the same lookups both ways.
+
+Usage:
+    python -m src.db.search_bench --users 1000000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from typing import Callable
+
+from src.db.database import Database
+from src.db.search import UserSearch
+
+FIRST_NAMES: tuple[str] = ("María", "José", "Juan", "Luisa", "Andrés", "Camila", "Santiago",
+                           "Valentina", "Carlos", "Daniela", "Felipe", "Laura")
+LAST_NAMES: tuple[str] = ("González", "Rodríguez", "Gómez", "López", "Martínez", "Díaz",
+                          "Hernández", "Restrepo", "Cárdenas", "Ospina", "Zapata", "Villegas")
+SYLLABLES: tuple[str] = ("ba", "ca", "da", "fe", "go", "la", "mi", "no", "pa", "ri", "sa", "to",
+                         "ve", "za", "rro", "lle", "que", "gui", "ran", "dez")
+
+
+def _surname(rng: random.Random) -> str:
+    """Returns a known surname or an invented one, giving a realistic vocabulary."""
+    if rng.random() < 0.3:
+        return rng.choice(LAST_NAMES)
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def _prepare(path: str, users: int) -> None:
+    """
+    Fills a new database with random users and builds the search indexes.
+
+    Args:
+        path (str): Path of the scratch database file.
+        users (int): Number of users to create.
+    """
+    Database.set_database_url(path)
+    Database.create_tables()
+    rng: random.Random = random.Random(0)
+    con: sqlite3.Connection = sqlite3.connect(path)
+    try:
+        con.executemany("INSERT INTO users(name, phone_number) VALUES(?, ?)",
+                        ((f"{rng.choice(FIRST_NAMES)} {_surname(rng)} {_surname(rng)}",
+                          3000000000 + rng.randrange(10 ** 9))
+                         for _ in range(users)))
+        con.commit()
+    finally:
+        con.close()
+    UserSearch.create_index()
+
+
+def _time(function: Callable[[], object], repeat: int) -> float:
+    """Returns the mean run time of `function` in milliseconds."""
+    start: float = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare UserSearch with LIKE scans.")
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "search.db")
+        _prepare(path, args.users)
+        con: sqlite3.Connection = sqlite3.connect(path)
+
+        # Ordered like the search results, so the scan cannot stop at the
+        # first 20 rows that happen to match.
+        def like(pattern: str, column: str = "name") -> Callable[[], object]:
+            query: str = (f"SELECT id, name, phone_number FROM users WHERE {column} LIKE ? "
+                          f"ORDER BY {column} LIMIT 20")
+            return lambda: con.execute(query, (pattern,)).fetchall()
+
+        cases: list[tuple[str, Callable[[], object], Callable[[], object]]] = [
+            ("prefix 'camil rest'", lambda: UserSearch.search("camil rest"), like("%camil%rest%")),
+            ("typo 'gonzales'", lambda: UserSearch.search("gonzales"), like("%gonzales%")),
+            ("phone suffix '4821'", lambda: UserSearch.search("4821"), like("%4821", "phone_number")),
+        ]
+
+        print(f"{args.users} users")
+        print(f"{'lookup':<22} {'search ms':>10} {'LIKE ms':>10}")
+        for name, search, scan in cases:
+            print(f"{name:<22} {_time(search, args.repeat):>10.2f} {_time(scan, args.repeat):>10.2f}")
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -16,3 +16,9 @@ class NoFoundPhoneNumber(DatabaseException):
 
 class NoFoundUser(DatabaseException):
     """Class docstring"""
+
+class BackupCorrupted(DatabaseException):
+    """Exception raised when a backup is missing, altered or fails its integrity check"""
+
+class NoFoundBackup(DatabaseException):
+    """Exception raised when no backup matches the requested restore point"""
@@ -3,3 +3,6 @@ from src.exceptions.base_exception import BaseAppException
 
 class NoAvaliableDriverTest(BaseAppException):
     """Class docstring"""
+
+class BookingQueueFull(BaseAppException):
+    """The booking queue stayed full for longer than the caller was willing to wait."""
@@ -0,0 +1,62 @@
+"""This module defines the `CatalogSnapshot` class, an immutable view of the
+vehicle catalog: the options offered to customers and which configurations
+each branch sells, at what price.
+
+Lookups are answered from precomputed dictionaries, so checking or pricing a
+configuration on the purchase path is a single dictionary access.
+"""
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+# (branch, car type, rim type, engine displacement)
+Configuration = tuple[str, str, str, int]
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    """Represents the vehicle catalog at a given version.
+
+    Attributes:
+        version (int): Version stamp of the catalog this snapshot was loaded from.
+        car_types (tuple[str, ...]): Car types, in display order.
+        rim_types (tuple[str, ...]): Rim types, in display order.
+        engine_displacements (tuple[int, ...]): Engine displacements, in display order.
+        pay_methods (tuple[str, ...]): Payment methods, in display order.
+        branches (tuple[str, ...]): Branches, in display order.
+        prices (Mapping[Configuration, Optional[int]]): Price of every
+        configuration sold, by (branch, car type, rim type, engine
+        displacement). None means the price is given at the dealership.
+        car_types_by_branch (Mapping[str, tuple[str, ...]]): Car types each
+        branch sells at least one configuration of.
+    """
+
+    version: int
+    car_types: tuple[str, ...]
+    rim_types: tuple[str, ...]
+    engine_displacements: tuple[int, ...]
+    pay_methods: tuple[str, ...]
+    branches: tuple[str, ...]
+    prices: Mapping[Configuration, Optional[int]]
+    car_types_by_branch: Mapping[str, tuple[str, ...]] = field(init=False)
+
+    def __post_init__(self) -> None:
+        by_branch: dict[str, list[str]] = {branch: list() for branch in self.branches}
+        for branch, car_type, _, _ in self.prices:
+            by_branch.setdefault(branch, list())
+            if car_type not in by_branch[branch]:
+                by_branch[branch].append(car_type)
+        ordered: dict[str, tuple[str, ...]] = {
+            branch: tuple(car_type for car_type in self.car_types if car_type in types)
+            for branch, types in by_branch.items()}
+        object.__setattr__(self, "prices", MappingProxyType(dict(self.prices)))
+        object.__setattr__(self, "car_types_by_branch", MappingProxyType(ordered))
+
+    def is_available(self, branch: str, car_type: str, rim_type: str, engine_displacement: int) -> bool:
+        """Returns whether the branch sells the configuration."""
+        return (branch, car_type, rim_type, engine_displacement) in self.prices
+
+    def price(self, branch: str, car_type: str, rim_type: str, engine_displacement: int) -> Optional[int]:
+        """Returns the price of a configuration at a branch, if it has one."""
+        return self.prices.get((branch, car_type, rim_type, engine_displacement))
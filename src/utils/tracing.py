@@ -0,0 +1,149 @@
+"""This module provides lightweight latency tracing for the UI callbacks and
+database calls, exported in the Chrome trace event format.
+
+Tracing is switched on with environment variables read at import time:
+
+* `DEALERSHIP_TRACE=1` records a span for every `@traced` function.
+* `DEALERSHIP_TRACE_FILE` is where the trace is written on exit
+  (default `trace.json`); open it in chrome://tracing or Perfetto.
+* `DEALERSHIP_TRACE_PROFILE` is the fraction (0 to 1) of top-level spans
+  also profiled with cProfile; the stats go to `<trace file>.prof`.
+
+When tracing is off, `traced` returns the function unchanged, so it costs
+nothing at call time.
+"""
+
+import atexit
+import cProfile
+import functools
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+ENABLED: bool = os.environ.get("DEALERSHIP_TRACE", "") not in ("", "0")
+TRACE_FILE: str = os.environ.get("DEALERSHIP_TRACE_FILE", "trace.json")
+PROFILE_RATE: float = float(os.environ.get("DEALERSHIP_TRACE_PROFILE", "0") or 0)
+
+
+class Tracer:
+    """
+    Collects spans and writes them as a Chrome trace.
+
+    Attributes:
+        _events (list[dict]): Finished spans as Chrome trace events.
+        _local (threading.local): Per-thread stack of open span names.
+        _profile (Optional[cProfile.Profile]): Profiler shared by the
+        sampled top-level spans.
+        _profiling (threading.Lock): Held while a span is being profiled;
+        a profiler can only be enabled once at a time.
+    """
+
+    def __init__(self) -> None:
+        self._events: list[dict] = list()
+        self._lock: threading.Lock = threading.Lock()
+        self._local: threading.local = threading.local()
+        self._profile: Optional[cProfile.Profile] = None
+        self._profiling: threading.Lock = threading.Lock()
+        self._start: float = time.perf_counter()
+
+    def call(self, name: str, category: str, function: Callable, *args, **kwargs) -> Any:
+        """
+        Runs `function` inside a span.
+
+        Spans opened while another is running on the same thread are recorded
+        as its children. A sampled span is only profiled if no other thread
+        is profiling one already.
+
+        Args:
+            name (str): Name of the span.
+            category (str): Category of the span, e.g. "ui" or "db".
+            function (Callable): The function to run.
+
+        Returns:
+            Any: Whatever `function` returns.
+        """
+        stack: list[str] = self._local.__dict__.setdefault("stack", list())
+        profile: bool = (not stack and PROFILE_RATE > 0 and random.random() < PROFILE_RATE
+                         and self._profiling.acquire(blocking=False))
+        if profile:
+            self._profile = self._profile or cProfile.Profile()
+            self._profile.enable()
+
+        stack.append(name)
+        start: float = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            end: float = time.perf_counter()
+            stack.pop()
+            if profile:
+                self._profile.disable()
+                self._profiling.release()
+            event: dict = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self._start) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {"parent": stack[-1] if stack else None, "profiled": profile},
+            }
+            with self._lock:
+                self._events.append(event)
+
+    def events(self) -> list[dict]:
+        """
+        Returns a copy of the recorded spans.
+
+        Returns:
+            list[dict]: The spans as Chrome trace events.
+        """
+        with self._lock:
+            return list(self._events)
+
+    def export(self, path: str = TRACE_FILE) -> None:
+        """
+        Writes the recorded spans, and the profile if any, to disk.
+
+        Args:
+            path (str): Path of the JSON trace file.
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, file)
+        if self._profile:
+            self._profile.dump_stats(path + ".prof")
+
+
+TRACER: Tracer = Tracer()
+
+if ENABLED:
+    atexit.register(TRACER.export)
+
+
+def traced(category: str, name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """
+    Decorates a function so each call is recorded as a span.
+
+    Args:
+        category (str): Category of the spans, e.g. "ui" or "db".
+        name (Optional[str]): Name of the spans. Defaults to the function's
+        qualified name.
+
+    Returns:
+        Callable[[Callable], Callable]: The decorator. It returns the function
+        itself when tracing is off.
+    """
+    def decorator(function: Callable) -> Callable:
+        if not ENABLED:
+            return function
+        span_name: str = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            return TRACER.call(span_name, category, function, *args, **kwargs)
+        return wrapper
+    return decorator
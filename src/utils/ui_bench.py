@@ -0,0 +1,87 @@
+"""Benchmark of screen navigation: rebuilding Toplevels versus the ScreenManager.
+
+Walks Welcome -> Purchase -> Welcome -> Driver Test -> Welcome repeatedly,
+first the old way (build a new screen, destroy the previous one) and then
+through `ScreenManager`, and reports the mean navigation latency and how
+many widgets were created along the way. Needs a display.
+
+Usage:
+    python -m src.utils.ui_bench --rounds 50
+"""
+
+import argparse
+import time
+import tkinter
+
+from src.app import Screen, ScreenManager, UIDriver_test, UIPurchase, UISelectEvent
+from src.models.user import User
+
+ROUTE: tuple[type[Screen], ...] = (UIPurchase, UISelectEvent, UIDriver_test, UISelectEvent)
+
+
+def _widgets(root: tkinter.Misc) -> list[str]:
+    """Returns the Tcl path of every widget under `root`."""
+    result: list[str] = list()
+    for child in root.winfo_children():
+        result.append(str(child))
+        result += _widgets(child)
+    return result
+
+
+def _navigate(root: tkinter.Tk, rounds: int, pooled: bool) -> tuple[float, int, int]:
+    """
+    Walks the route `rounds` times.
+
+    Args:
+        root (tkinter.Tk): The application root window.
+        rounds (int): How many times to walk the route.
+        pooled (bool): Whether to navigate through the ScreenManager.
+
+    Returns:
+        tuple[float, int, int]: Mean navigation time in milliseconds, widgets
+        created and widgets alive at the end.
+    """
+    user: User = User(name="bench", phone_number=3000000000, number_id=1)
+    seen: set[str] = set(_widgets(root))
+    created: int = 0
+    current: Screen = ScreenManager.show(UISelectEvent, user) if pooled else UISelectEvent(user)
+    root.update()
+
+    elapsed: float = 0.0
+    for _ in range(rounds):
+        for screen in ROUTE:
+            start: float = time.perf_counter()
+            if pooled:
+                current = ScreenManager.show(screen, user)
+            else:
+                previous: Screen = current
+                current = screen(user)
+                previous.destroy()
+            root.update()
+            elapsed += time.perf_counter() - start
+
+            alive: list[str] = _widgets(root)
+            created += len(set(alive) - seen)
+            seen.update(alive)
+
+    navigations: int = rounds * len(ROUTE)
+    return elapsed / navigations * 1000, created, len(_widgets(root))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure screen navigation latency.")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'mode':<10} {'ms/navigation':>14} {'widgets created':>16} {'widgets alive':>14}")
+    for mode, pooled in (("rebuild", False), ("pooled", True)):
+        root: tkinter.Tk = tkinter.Tk()
+        root.withdraw()
+        latency, created, alive = _navigate(root, args.rounds, pooled)
+        print(f"{mode:<10} {latency:>14.2f} {created:>16} {alive:>14}")
+        ScreenManager.clear()
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Checks of the slot archive against the isolated databases of `conftest.py`."""
+
+import datetime
+import os
+from typing import Iterator
+
+import pytest
+
+from src.db.archive import SlotArchive
+from src.db.database import Database
+from src.db.harness import isolated_database
+from src.utils.color import Color
+
+FIRST_DAY: datetime.date = datetime.date(2023, 1, 1)
+
+
+@pytest.fixture(name="slot_archive")
+def fixture_slot_archive(tmp_path) -> Iterator[SlotArchive]:
+    """An archive of a fresh database holding 400 daily slots over 14 months."""
+    with isolated_database("file"):
+        Database.add_driver_tests([(FIRST_DAY + datetime.timedelta(days=i), datetime.time(10), "Sedan", "Sport",
+                                    2000, Color(0, 0, 0), Color(0, 0, 0), "Cali") for i in range(400)])
+        yield SlotArchive(os.path.join(tmp_path, "archive"), horizon_days=30, batch_size=100)
+
+
+def test_run_keeps_slots_booked_while_archiving(slot_archive: SlotArchive,
+                                               monkeypatch: pytest.MonkeyPatch) -> None:
+    open_month = getattr(slot_archive, "_open_month")
+
+    def book_then_open(month: str):
+        con = Database.open_connection()
+        try:
+            con.execute("UPDATE driver_test SET available = 0, driver_id = 7 WHERE id = 5")
+            con.commit()
+        finally:
+            con.close()
+        return open_month(month)
+
+    # Book a slot between the copy of its batch and the delete.
+    monkeypatch.setattr(slot_archive, "_open_month", book_then_open)
+    assert slot_archive.run(datetime.date(2024, 6, 1)) == 400
+
+    con = slot_archive.connect_history(FIRST_DAY, datetime.date(2024, 12, 31))
+    try:
+        assert con.execute("SELECT COUNT(*), COUNT(DISTINCT id) FROM driver_test_history").fetchone() == (400, 400)
+        assert con.execute("SELECT available, driver_id FROM driver_test_history WHERE id = 5").fetchone() == (0, 7)
+    finally:
+        con.close()
+
+
+def test_history_spans_more_months_than_attachable(slot_archive: SlotArchive) -> None:
+    slot_archive.run(datetime.date(2024, 6, 1))
+    assert len(slot_archive.months()) == 14
+    assert sum(1 for _ in slot_archive.history(FIRST_DAY, datetime.date(2024, 12, 31))) == 400
+    con = slot_archive.connect_history(datetime.date(2023, 3, 1), datetime.date(2023, 4, 30))
+    try:
+        assert con.execute("SELECT COUNT(*) FROM driver_test_history").fetchone()[0] == 61
+    finally:
+        con.close()
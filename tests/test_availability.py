@@ -0,0 +1,22 @@
+"""Checks of the daily_availability summary against the isolated databases of
+`conftest.py`."""
+
+import pytest
+
+from src.db.availability import DailyAvailability
+from src.db.database import Database
+
+
+@pytest.mark.usefixtures("database")
+def test_summary_counts_slots_without_availability() -> None:
+    con = Database.open_connection()
+    try:
+        con.execute("INSERT INTO driver_test(test_day, car_type) VALUES ('2030-01-01', 'Sedan')")
+        con.execute("INSERT INTO driver_test(test_day, car_type, available) VALUES ('2030-01-01', 'Sedan', 1)")
+        con.execute("UPDATE driver_test SET available = NULL WHERE available = 1")
+        con.commit()
+    finally:
+        con.close()
+    assert DailyAvailability.verify() == []
+    DailyAvailability.rebuild()
+    assert DailyAvailability.verify() == []
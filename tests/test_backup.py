@@ -0,0 +1,58 @@
+"""Checks of backups and point-in-time restores against the isolated databases
+of `conftest.py`."""
+
+import datetime
+import os
+import sqlite3
+import time
+
+import pytest
+
+from src.db.backup import BackupManager
+from src.db.changelog import Changelog
+from src.db.database import Database
+
+
+def _names(url: str) -> list[str]:
+    con: sqlite3.Connection = sqlite3.connect(url)
+    try:
+        return [i[0] for i in con.execute("SELECT name FROM users ORDER BY id")]
+    finally:
+        con.close()
+
+
+@pytest.mark.usefixtures("file_database")
+def test_retention_prunes_the_changelog(tmp_path) -> None:
+    Changelog.create()
+    manager: BackupManager = BackupManager(os.path.join(tmp_path, "backups"), retention=2)
+    for i in range(3):
+        Database.add_user(f"user {i}", 3000000000 + i)
+        manager.backup()
+
+    oldest: int = manager.records()[0].changelog_seq
+    con: sqlite3.Connection = Database.open_connection()
+    try:
+        assert con.execute("SELECT MIN(seq) FROM changelog").fetchone()[0] == oldest + 1
+    finally:
+        con.close()
+
+
+@pytest.mark.usefixtures("file_database")
+def test_restore_accepts_iso_moments(tmp_path) -> None:
+    Changelog.create()
+    manager: BackupManager = BackupManager(os.path.join(tmp_path, "backups"))
+    Database.add_user("kept", 3000000001)
+    Database.add_user("deleted later", 3000000002)
+    manager.backup()
+    time.sleep(0.01)
+    moment: datetime.datetime = datetime.datetime.now(datetime.timezone.utc)
+    time.sleep(0.01)
+    Database.add_user("created later", 3000000003)
+    Database.del_user(3000000002)
+
+    target: str = os.path.join(tmp_path, "restored.db")
+    manager.restore(target, moment.isoformat())
+    assert _names(target) == ["kept", "deleted later"]
+
+    with pytest.raises(ValueError):
+        manager.restore(os.path.join(tmp_path, "other.db"), "yesterday")
@@ -0,0 +1,32 @@
+"""Checks of the BookingPool against the isolated databases of `conftest.py`."""
+
+import datetime
+
+import pytest
+
+from src.db.booking_pool import BookingPool
+from src.db.database import Database
+from src.models.driver_test import DriverTest
+from src.models.user import User
+from src.utils.color import Color
+
+
+@pytest.mark.usefixtures("database")
+def test_cancelled_booking_is_skipped() -> None:
+    Database.add_user("driver", 3000000001)
+    user: User = Database.get_user(3000000001)
+    Database.add_driver_tests([(datetime.date.today() + datetime.timedelta(days=1), datetime.time(8),
+                                "Sedan", "Sport", 2000, Color(0, 0, 0), Color(0, 0, 0), "Cali")] * 4)
+
+    with BookingPool(workers=1, batch_size=4, batch_wait=0.5) as pool:
+        futures = [pool.submit(user, DriverTest(number_id=slot)) for slot in (1, 2, 3)]
+        assert futures[0].cancel()
+        for future in futures[1:]:
+            assert future.result(timeout=5) is None
+        assert pool.submit(user, DriverTest(number_id=4)).result(timeout=5) is None
+
+    con = Database.open_connection()
+    try:
+        assert con.execute("SELECT id FROM driver_test WHERE available = 1").fetchall() == [(1,)]
+    finally:
+        con.close()
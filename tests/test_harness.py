@@ -0,0 +1,80 @@
+"""Correctness checks of the Database layer under the isolated databases of
+`conftest.py`."""
+
+import datetime
+import threading
+
+import pytest
+
+from src.db.database import Database
+from src.db.harness import LoadReport, check_invariants, run_load
+from src.exceptions import db_exceptions, diver_test_exceptions
+from src.models.driver_test import DriverTest
+from src.models.user import User
+from src.utils.color import Color
+
+DAY: datetime.date = datetime.date.today() + datetime.timedelta(days=1)
+
+
+def _add_slot() -> int:
+    """Adds a free slot and returns its id."""
+    Database.add_driver_tests([(DAY, datetime.time(8), "Sedan", "Sport", 2000,
+                                Color(0, 0, 0), Color(0, 0, 0), "Cali")])
+    con = Database.open_connection()
+    try:
+        return con.execute("SELECT MAX(id) FROM driver_test").fetchone()[0]
+    finally:
+        con.close()
+
+
+@pytest.mark.usefixtures("database")
+def test_run_load_keeps_invariants() -> None:
+    report: LoadReport = run_load(threads=4, operations=400, seed=1)
+    assert report.ok(), report.errors + report.violations
+    assert sum(report.operations.values()) == 400
+
+
+@pytest.mark.usefixtures("database")
+def test_slot_is_not_booked_twice() -> None:
+    Database.add_user("first", 3000000001)
+    Database.add_user("second", 3000000002)
+    first: User = Database.get_user(3000000001)
+    second: User = Database.get_user(3000000002)
+    slot: int = _add_slot()
+
+    Database.book_driver_test(first, DriverTest(number_id=slot))
+    with pytest.raises(diver_test_exceptions.NoAvaliableDriverTest):
+        Database.book_driver_test(second, DriverTest(number_id=slot))
+    assert Database.book_driver_tests([(second.get_id(), slot)]) == [False]
+    assert check_invariants() == []
+
+
+@pytest.mark.usefixtures("database")
+def test_concurrent_bookings_have_one_winner() -> None:
+    Database.add_user("driver", 3000000001)
+    user_id: int = Database.get_user(3000000001).get_id()
+    slot: int = _add_slot()
+    results: list[bool] = list()
+    barrier: threading.Barrier = threading.Barrier(8)
+
+    def book() -> None:
+        barrier.wait()
+        results.extend(Database.book_driver_tests([(user_id, slot)]))
+
+    threads: list[threading.Thread] = [threading.Thread(target=book) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == [False] * 7 + [True]
+
+
+@pytest.mark.usefixtures("database")
+def test_phone_number_is_not_repeated() -> None:
+    Database.add_user("first", 3000000001)
+    with pytest.raises(db_exceptions.PhoneNumberRepeated):
+        Database.add_user("second", 3000000001)
+    Database.add_user("second", 3000000002)
+    with pytest.raises(db_exceptions.PhoneNumberRepeated):
+        Database.edit_user(3000000002, new_phone_number=3000000001)
+    assert check_invariants() == []
@@ -0,0 +1,41 @@
+"""Checks of the read replica snapshots."""
+
+import os
+import sqlite3
+
+import pytest
+
+from src.db.replica import ReplicaManager, copy_snapshot
+
+
+def test_replica_switches_primary_to_wal(tmp_path) -> None:
+    primary_url: str = os.path.join(tmp_path, "primary.db")
+    con: sqlite3.Connection = sqlite3.connect(primary_url)
+    con.execute("CREATE TABLE users(id INTEGER PRIMARY KEY, name TEXT)")
+    con.execute("INSERT INTO users(name) VALUES ('Ana')")
+    con.commit()
+    con.close()
+
+    replica: ReplicaManager = ReplicaManager(primary_url, os.path.join(tmp_path, "replica.db"), pages=1)
+    replica.refresh()
+    con = replica.connect()
+    try:
+        assert con.execute("SELECT name FROM users").fetchall() == [("Ana",)]
+    finally:
+        con.close()
+    con = sqlite3.connect(primary_url)
+    try:
+        assert con.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        con.close()
+
+
+def test_snapshot_refuses_rollback_journal(tmp_path) -> None:
+    source: sqlite3.Connection = sqlite3.connect(os.path.join(tmp_path, "primary.db"))
+    target: sqlite3.Connection = sqlite3.connect(os.path.join(tmp_path, "copy.db"))
+    try:
+        with pytest.raises(ValueError):
+            copy_snapshot(source, target, pages=1, sleep=0)
+    finally:
+        target.close()
+        source.close()
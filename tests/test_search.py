@@ -0,0 +1,24 @@
+"""Checks of the customer search against the isolated databases of `conftest.py`."""
+
+import pytest
+
+from src.db.database import Database
+from src.db.search import UserSearch
+
+
+@pytest.mark.usefixtures("database")
+def test_typo_finds_late_match_behind_common_fragment() -> None:
+    UserSearch.create_index()
+    con = Database.open_connection()
+    try:
+        con.executemany("INSERT INTO users(name, phone_number) VALUES (?, ?)",
+                        [(f"Pedro Morales{i}", 3000000000 + i) for i in range(600)])
+        con.commit()
+    finally:
+        con.close()
+    Database.add_user("Ana González", 3100000000)
+
+    assert UserSearch.search("gonzales", limit=5)[0].get_name() == "Ana González"
+    names: list[str] = [user.get_name() for offset in range(0, 601, 50)
+                        for user in UserSearch.search("gonzales", limit=50, offset=offset)]
+    assert names.count("Ana González") == 1